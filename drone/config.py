@@ -18,6 +18,15 @@ class ModelConfig(BaseModel):
     model_id: str
     max_tokens: int = 2048
     temperature: float = 0.7
+    # Cosine similarity (e.g. 0.92) above which a paraphrased prompt reuses a cached
+    # response; None disables the semantic cache (requires sentence-transformers)
+    semantic_cache_threshold: Optional[float] = None
+    # Shared HTTP connection pool used for cloud providers (LiteLLM)
+    http_max_connections: int = 2000
+    http_max_keepalive_connections: int = 1500
+    http_timeout: float = 120.0
+    # Open the connection to the provider in the background at startup
+    prewarm: bool = True
 
 class DroneConfig(BaseModel):
     """Configuration for drone connection."""
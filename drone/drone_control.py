@@ -5,31 +5,85 @@ This module provides functions for controlling real drones using DroneKit-Python
 
 import time
 import math
+import operator
+import threading
 # Import compatibility fix for collections.MutableMapping
 from . import compatibility_fix
 from dronekit import connect, VehicleMode, LocationGlobalRelative, Command
 from pymavlink import mavutil
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('drone_control')
 
+# Message rates (Hz) requested from the autopilot after connecting, keyed by MAVLink
+# message ID. Only the messages this module reads are listed; a rate of 0 disables a message.
+DEFAULT_STREAM_RATES = {
+    mavutil.mavlink.MAVLINK_MSG_ID_SYS_STATUS: 2,
+    mavutil.mavlink.MAVLINK_MSG_ID_GPS_RAW_INT: 2,
+    mavutil.mavlink.MAVLINK_MSG_ID_GLOBAL_POSITION_INT: 10,
+    mavutil.mavlink.MAVLINK_MSG_ID_VFR_HUD: 4,
+}
+
+# ArduCopter custom mode numbers used for the MAVLink SET_MODE fallback
+COPTER_MODE_NUMBERS = {
+    "GUIDED": 4,
+    "AUTO": 3,
+    "LAND": 9,
+    "RTL": 6,
+}
+
 class DroneController:
     """Class to handle real drone control operations using DroneKit."""
     
-    def __init__(self, connection_string: str = None):
+    def __init__(self, connection_string: str = None, telemetry_interval: float = 0.1,
+                 stream_rates: Optional[Dict[int, float]] = None):
         """
         Initialize the drone controller.
         
         Args:
             connection_string: Connection string for the drone (e.g., 'udp:127.0.0.1:14550' for SITL,
                               '/dev/ttyACM0' for serial, or 'tcp:192.168.1.1:5760' for remote connection)
+            telemetry_interval: Seconds between background telemetry snapshots
+            stream_rates: MAVLink message ID -> rate in Hz to request after connecting
+                          (defaults to DEFAULT_STREAM_RATES)
         """
         self.vehicle = None
         self.connection_string = connection_string
         self.connected = False
+        self.stream_rates = dict(DEFAULT_STREAM_RATES if stream_rates is None else stream_rates)
+        
+        # Latest telemetry snapshot, refreshed by a background thread so the
+        # getters don't read through DroneKit on the caller's thread
+        self.telemetry_interval = telemetry_interval
+        self._latest: Dict[str, Any] = {}
+        self._latest_lock = threading.Lock()
+        # Stop flag of the running telemetry thread; each thread gets its own so
+        # a quick reconnect can't revive one that was already told to stop
+        self._telemetry_stop: Optional[threading.Event] = None
+        self._telemetry_thread: Optional[threading.Thread] = None
+        # Bumped whenever a telemetry tick sees different values, so callers can
+        # tell that nothing changed without comparing snapshots themselves
+        self.state_seq = 0
+        
+        # Mode objects and MAVLink constants reused across commands
+        self._MODE_GUIDED = VehicleMode("GUIDED")
+        self._MODE_AUTO = VehicleMode("AUTO")
+        self._MODE_LAND = VehicleMode("LAND")
+        self._MODE_RTL = VehicleMode("RTL")
+        self._MODE_CACHE = {
+            "GUIDED": self._MODE_GUIDED,
+            "AUTO": self._MODE_AUTO,
+            "LAND": self._MODE_LAND,
+            "RTL": self._MODE_RTL,
+        }
+        self._mav = mavutil.mavlink
+        self._MAV_FRAME = self._mav.MAV_FRAME_GLOBAL_RELATIVE_ALT
+        self._MAV_WP = self._mav.MAV_CMD_NAV_WAYPOINT
+        self._message_factory = None
+        self._set_mode_msgs: Dict[str, Any] = {}
     
     def connect_to_drone(self, connection_string: str = None, timeout: int = 10) -> bool:
         """
@@ -50,7 +104,7 @@ class DroneController:
             return False
             
         try:
-            logger.info(f"Connecting to drone on {self.connection_string}...")
+            logger.info("Connecting to drone on %s...", self.connection_string)
             # Connect without wait_ready to avoid iteration issues
             self.vehicle = connect(self.connection_string, wait_ready=False, timeout=timeout)
             
@@ -66,30 +120,54 @@ class DroneController:
                 time.sleep(0.1)
             
             self.connected = True
+            self._message_factory = self.vehicle.message_factory
+            self._set_mode_msgs = self._encode_set_mode_messages()
             logger.info("Connected to drone successfully")
             
+            self._configure_stream_rates()
+            self._start_telemetry()
+            
             # Log basic vehicle info safely
             try:
                 if hasattr(self.vehicle, 'version'):
-                    logger.info(f"Vehicle Version: {self.vehicle.version}")
+                    logger.info("Vehicle Version: %s", self.vehicle.version)
                 if hasattr(self.vehicle, 'system_status') and hasattr(self.vehicle.system_status, 'state'):
-                    logger.info(f"Vehicle Status: {self.vehicle.system_status.state}")
+                    logger.info("Vehicle Status: %s", self.vehicle.system_status.state)
             except Exception as e:
-                logger.warning(f"Could not read vehicle info: {e}")
+                logger.warning("Could not read vehicle info: %s", e)
             
             return True
         except Exception as e:
-            logger.error(f"Error connecting to drone: {str(e)}")
+            logger.error("Error connecting to drone: %s", e)
             self.connected = False
             return False
     
     def disconnect(self) -> None:
-        """Disconnect from the drone."""
-        if self.vehicle and self.connected:
-            logger.info("Disconnecting from drone...")
-            self.vehicle.close()
-            self.connected = False
+        """
+        Disconnect from the drone.
+        Safe to call repeatedly; returns immediately and closes the link in the background.
+        """
+        if not (self.vehicle and self.connected):
+            return
+        
+        logger.info("Disconnecting from drone...")
+        # Flip state first so concurrent commands short-circuit in _ensure_connected
+        self.connected = False
+        vehicle = self.vehicle
+        self.vehicle = None
+        
+        self._stop_telemetry()
+        
+        # vehicle.close() joins DroneKit's threads and can stall for seconds
+        threading.Thread(target=self._close_vehicle, args=(vehicle,), daemon=True).start()
+    
+    def _close_vehicle(self, vehicle) -> None:
+        """Close a DroneKit vehicle (runs in a background thread)."""
+        try:
+            vehicle.close()
             logger.info("Disconnected from drone")
+        except Exception as e:
+            logger.warning("Error closing vehicle: %s", e)
     
     def arm_and_takeoff(self, target_altitude: float) -> bool:
         """
@@ -111,18 +189,16 @@ class DroneController:
             return False
         
         # Check if vehicle is armable
-        logger.info(f"Pre-flight checks: Armable={self.vehicle.is_armable}, System Status={self.vehicle.system_status.state}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Pre-flight checks: Armable=%s, System Status=%s",
+                        self.vehicle.is_armable, self.vehicle.system_status.state)
         
         # Wait for vehicle to be armable
         logger.info("Waiting for vehicle to be armable...")
         timeout = 30
-        start = time.time()
-        while not self.vehicle.is_armable:
-            if time.time() - start > timeout:
-                logger.error(f"Vehicle not armable after {timeout}s. System status: {self.vehicle.system_status.state}")
-                return False
-            logger.info(f"Waiting... Armable: {self.vehicle.is_armable}, System: {self.vehicle.system_status.state}")
-            time.sleep(1)
+        if not self._wait_until(lambda: self.vehicle.is_armable, timeout):
+            logger.error("Vehicle not armable after %ss. System status: %s", timeout, self.vehicle.system_status.state)
+            return False
         
         logger.info("Vehicle is armable!")
         
@@ -133,47 +209,35 @@ class DroneController:
         logger.info("Switching to GUIDED mode...")
         
         # Check current mode
-        current_mode = self.vehicle.mode.name
-        logger.info(f"Current mode: {current_mode}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Current mode: %s", self.vehicle.mode.name)
         
         # Try switching to GUIDED mode
         try:
             # Method 1: Direct mode setting
             logger.info("Attempting mode change to GUIDED...")
-            self.vehicle.mode = VehicleMode("GUIDED")
-            self.vehicle.flush()  # Flush the message buffer
-            time.sleep(1)
+            self._wait_mode("GUIDED", timeout=1)
             
             # Check if mode changed
-            logger.info(f"Mode after first attempt: {self.vehicle.mode.name}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Mode after first attempt: %s", self.vehicle.mode.name)
             
             # If still not in GUIDED, try MAVLink command
             if self.vehicle.mode.name != "GUIDED":
                 logger.info("Direct mode change didn't work, trying MAVLink command...")
-                # Send MAVLink SET_MODE command
-                # GUIDED mode number is 4 for Copter
-                msg = self.vehicle.message_factory.set_mode_encode(
-                    0,  # target system
-                    mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-                    4   # GUIDED mode for copter
-                )
-                self.vehicle.send_mavlink(msg)
-                self.vehicle.flush()
-                time.sleep(1)
-                logger.info(f"Mode after MAVLink attempt: {self.vehicle.mode.name}")
+                # Send the pre-encoded MAVLink SET_MODE command
+                # No flush/sleep here: the mode listener below picks up the transition
+                self.vehicle.send_mavlink(self._set_mode_msgs["GUIDED"])
         except Exception as e:
-            logger.error(f"Error setting mode: {e}")
+            logger.error("Error setting mode: %s", e)
         
         # Wait until mode change is verified
-        timeout = 15  # seconds
-        start = time.time()
-        while self.vehicle.mode.name != "GUIDED":
-            if time.time() - start > timeout:
-                logger.error(f"Failed to enter GUIDED mode (stuck in {self.vehicle.mode.name})")
-                logger.error("This might be a simulator issue. Try restarting the simulator.")
-                return False
-            logger.info(f"Waiting for GUIDED mode... Current: {self.vehicle.mode.name}")
-            time.sleep(0.5)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Waiting for GUIDED mode... Current: %s", self.vehicle.mode.name)
+        if not self._wait_mode("GUIDED", timeout=15):
+            logger.error("Failed to enter GUIDED mode (stuck in %s)", self.vehicle.mode.name)
+            logger.error("This might be a simulator issue. Try restarting the simulator.")
+            return False
         
         logger.info("GUIDED mode confirmed!")
         logger.info("Arming motors...")
@@ -182,14 +246,9 @@ class DroneController:
         self.vehicle.armed = True
         
         # Wait for arming
-        timeout = 15  # seconds (increased timeout)
-        start = time.time()
-        while not self.vehicle.armed:
-            if time.time() - start > timeout:
-                logger.error(f"Failed to arm. Armable: {self.vehicle.is_armable}, System Status: {self.vehicle.system_status.state}")
-                return False
-            logger.info(f"Waiting to arm... Armed: {self.vehicle.armed}, Armable: {self.vehicle.is_armable}")
-            time.sleep(0.5)
+        if not self._wait_for_attribute('armed', bool, timeout=15):
+            logger.error("Failed to arm. Armable: %s, System Status: %s", self.vehicle.is_armable, self.vehicle.system_status.state)
+            return False
         
         logger.info("Armed successfully!")
         
@@ -197,16 +256,27 @@ class DroneController:
         # Take off to target altitude
         self.vehicle.simple_takeoff(target_altitude)
         
-        # Wait until target altitude reached
-        while True:
-            current_altitude = self.vehicle.location.global_relative_frame.alt
-            logger.info(f"Altitude: {current_altitude}")
-            
-            # Break and return when we're close enough to target altitude
-            if current_altitude >= target_altitude * 0.95:
-                logger.info("Reached target altitude")
-                break
-            time.sleep(1)
+        # Wait until we're close enough to target altitude
+        altitude_threshold = target_altitude * 0.95
+        position_updates = 0
+        
+        def reached_altitude(frame) -> bool:
+            nonlocal position_updates
+            if frame is None or frame.alt is None:
+                return False
+            # Log climb progress on every 10th position update only
+            position_updates += 1
+            if position_updates % 10 == 0 and logger.isEnabledFor(logging.INFO):
+                logger.info("Altitude: %s", frame.alt)
+            return frame.alt >= altitude_threshold
+        
+        # Allow a slow 1 m/s climb plus spin-up margin; a mode change or
+        # failsafe mid-climb would otherwise leave this waiting forever
+        climb_timeout = 30 + target_altitude / 1.0
+        if not self._wait_for_attribute('location.global_relative_frame', reached_altitude, timeout=climb_timeout):
+            logger.error("Did not reach %sm within %.0fs (mode: %s)", target_altitude, climb_timeout, self.vehicle.mode.name)
+            return False
+        logger.info("Reached target altitude")
         
         return True
     
@@ -221,7 +291,7 @@ class DroneController:
             return False
             
         logger.info("Landing...")
-        self.vehicle.mode = VehicleMode("LAND")
+        self.vehicle.mode = self._MODE_LAND
         return True
     
     def return_to_launch(self) -> bool:
@@ -235,7 +305,7 @@ class DroneController:
             return False
             
         logger.info("Returning to launch location...")
-        self.vehicle.mode = VehicleMode("RTL")
+        self.vehicle.mode = self._MODE_RTL
         return True
     
     def goto_location(self, latitude: float, longitude: float, altitude: float) -> bool:
@@ -253,25 +323,18 @@ class DroneController:
         if not self._ensure_connected():
             return False
             
-        logger.info(f"Going to location: Lat: {latitude}, Lon: {longitude}, Alt: {altitude}")
+        logger.info("Going to location: Lat: %s, Lon: %s, Alt: %s", latitude, longitude, altitude)
         
         # Make sure vehicle is in GUIDED mode
-        if self.vehicle.mode.name != "GUIDED":
-            self.vehicle.mode = VehicleMode("GUIDED")
-            # Wait for mode change
-            timeout = 5
-            start = time.time()
-            while self.vehicle.mode.name != "GUIDED":
-                if time.time() - start > timeout:
-                    logger.error("Failed to enter GUIDED mode")
-                    return False
-                time.sleep(0.5)
+        if not self._wait_mode("GUIDED", timeout=5):
+            logger.error("Failed to enter GUIDED mode")
+            return False
         
         # Create LocationGlobalRelative object and send command
         target_location = LocationGlobalRelative(latitude, longitude, altitude)
         self.vehicle.simple_goto(target_location)
         
-        logger.info(f"Going to location: Lat: {latitude}, Lon: {longitude}, Alt: {altitude}")
+        logger.info("Going to location: Lat: %s, Lon: %s, Alt: %s", latitude, longitude, altitude)
         return True
     
     def get_current_location(self) -> Dict[str, float]:
@@ -283,6 +346,10 @@ class DroneController:
         """
         if not self._ensure_connected():
             return {"error": "Not connected to drone"}
+        
+        latest = self._get_latest()
+        if latest:
+            return dict(latest["location"])
             
         location = self.vehicle.location.global_relative_frame
         return {
@@ -300,6 +367,10 @@ class DroneController:
         """
         if not self._ensure_connected():
             return {"error": "Not connected to drone"}
+        
+        latest = self._get_latest()
+        if latest:
+            return dict(latest["battery"])
             
         return {
             "voltage": self.vehicle.battery.voltage,
@@ -316,6 +387,10 @@ class DroneController:
         """
         if not self._ensure_connected():
             return -1.0
+        
+        latest = self._get_latest()
+        if latest:
+            return latest["airspeed"]
             
         return self.vehicle.airspeed
         
@@ -328,44 +403,94 @@ class DroneController:
         """
         if not self._ensure_connected():
             return -1.0
+        
+        latest = self._get_latest()
+        if latest:
+            return latest["groundspeed"]
             
         return self.vehicle.groundspeed
     
-    def upload_mission(self, waypoints: List[Dict[str, float]]) -> bool:
+    def get_status_snapshot(self) -> Dict[str, Any]:
+        """
+        Get mode, armed state, altitude, battery and GPS position in a single read.
+        
+        Returns:
+            Dict containing mode, armed, altitude, battery level and gps lat/lon
+        """
+        latest = self._get_latest()
+        if latest:
+            location = latest["location"]
+            return {
+                "mode": latest["mode"],
+                "armed": latest["armed"],
+                "altitude": location["altitude"],
+                "battery": latest["battery"]["level"],
+                "gps": {
+                    "lat": location["latitude"],
+                    "lon": location["longitude"]
+                }
+            }
+        
+        vehicle = self.vehicle
+        location = vehicle.location
+        relative_frame = location.global_relative_frame if location else None
+        global_frame = location.global_frame if location else None
+        battery = vehicle.battery
+        return {
+            "mode": str(vehicle.mode.name),
+            "armed": vehicle.armed,
+            "altitude": relative_frame.alt if relative_frame else None,
+            "battery": battery.level if battery else None,
+            "gps": {
+                "lat": global_frame.lat if global_frame else None,
+                "lon": global_frame.lon if global_frame else None
+            }
+        }
+    
+    def upload_mission(self, waypoints: Optional[List[Dict[str, float]]] = None,
+                       waypoints_array: Optional[Sequence[Sequence[float]]] = None) -> bool:
         """
         Upload a mission with multiple waypoints to the drone.
         
         Args:
-            waypoints: List of dictionaries with lat, lon, alt for each waypoint
+            waypoints: List of dictionaries with lat, lon, alt for each waypoint (slow path)
+            waypoints_array: Alternative (N, 4) array of [lat, lon, alt, delay] rows, e.g. a
+                             numpy array; skips the per-waypoint dict lookups for large missions
             
         Returns:
             bool: True if mission upload successful, False otherwise
         """
         if not self._ensure_connected():
             return False
+        
+        if waypoints_array is not None:
+            # ndarray.tolist() converts every element to a Python float in one C call
+            rows = waypoints_array.tolist() if hasattr(waypoints_array, 'tolist') else waypoints_array
+        elif waypoints is not None:
+            rows = [(wp["lat"], wp["lon"], wp["alt"], wp.get("delay", 0)) for wp in waypoints]
+        else:
+            logger.error("No waypoints provided")
+            return False
             
-        logger.info(f"Uploading mission with {len(waypoints)} waypoints...")
+        logger.info("Uploading mission with %s waypoints...", len(rows))
+        
+        # Build the full command list up front, then hand it to DroneKit in one pass
+        frame = self._MAV_FRAME
+        nav_waypoint = self._MAV_WP
+        home = self.vehicle.home_location
+        
+        # Home location is the first waypoint, followed by the mission waypoints
+        # (delay is the hold time at the waypoint, 0 = no delay)
+        new_cmds = [Command(0, 0, 0, frame, nav_waypoint, 0, 0, 0, 0, 0, 0, home.lat, home.lon, 0)]
+        new_cmds.extend(
+            Command(0, 0, 0, frame, nav_waypoint, 0, 0, delay, 0, 0, 0, lat, lon, alt)
+            for lat, lon, alt, delay in rows
+        )
         
-        # Create list of commands
         cmds = self.vehicle.commands
         cmds.clear()
-        
-        # Add home location as first waypoint
-        cmds.add(Command(0, 0, 0, mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT, 
-                         mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, 0, 0, 0, 0, 0, 0, 
-                         self.vehicle.home_location.lat, 
-                         self.vehicle.home_location.lon, 
-                         0))
-        
-        # Add mission waypoints
-        for idx, wp in enumerate(waypoints):
-            # Add delay at waypoint (0 = no delay)
-            delay = wp.get("delay", 0)
-            
-            # Add waypoint command
-            cmds.add(Command(0, 0, 0, mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT, 
-                             mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, 0, 0, delay, 0, 0, 0, 
-                             wp["lat"], wp["lon"], wp["alt"]))
+        for cmd in new_cmds:
+            cmds.add(cmd)
         
         # Upload the commands to the vehicle
         cmds.upload()
@@ -383,16 +508,9 @@ class DroneController:
             return False
             
         logger.info("Executing mission...")
-        self.vehicle.mode = VehicleMode("AUTO")
-        
-        # Wait for mode change
-        timeout = 5
-        start = time.time()
-        while self.vehicle.mode.name != "AUTO":
-            if time.time() - start > timeout:
-                logger.error("Failed to enter AUTO mode")
-                return False
-            time.sleep(0.5)
+        if not self._wait_mode("AUTO", timeout=5):
+            logger.error("Failed to enter AUTO mode")
+            return False
         
         logger.info("Mission execution started")
         return True
@@ -410,7 +528,7 @@ class DroneController:
         if not self._ensure_connected():
             return False
             
-        logger.info(f"Setting airspeed to {speed} m/s")
+        logger.info("Setting airspeed to %s m/s", speed)
         self.vehicle.airspeed = speed
         return True
     
@@ -426,6 +544,174 @@ class DroneController:
             return False
         return True
     
+    def _encode_set_mode_messages(self) -> Dict[str, Any]:
+        """Encode the SET_MODE fallback message for each mode once per connection."""
+        return {
+            mode: self._message_factory.set_mode_encode(
+                0,  # target system
+                self._mav.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
+                custom_mode
+            )
+            for mode, custom_mode in COPTER_MODE_NUMBERS.items()
+        }
+    
+    def _configure_stream_rates(self) -> None:
+        """
+        Request the configured per-message rates from the autopilot.
+        Keeping unused streams quiet stops pymavlink's receive queue from backing up.
+        """
+        for msg_id, rate_hz in self.stream_rates.items():
+            # MAV_CMD_SET_MESSAGE_INTERVAL takes the interval in microseconds, -1 disables
+            interval_us = int(1_000_000 / rate_hz) if rate_hz > 0 else -1
+            try:
+                msg = self._message_factory.command_long_encode(
+                    0, 0,  # target system, target component
+                    self._mav.MAV_CMD_SET_MESSAGE_INTERVAL,
+                    0,  # confirmation
+                    msg_id, interval_us, 0, 0, 0, 0, 0
+                )
+                self.vehicle.send_mavlink(msg)
+            except Exception as e:
+                logger.warning("Could not set rate for message %s: %s", msg_id, e)
+    
+    def _start_telemetry(self) -> None:
+        """Start the background thread that keeps the telemetry snapshot fresh."""
+        if self._telemetry_stop is not None:
+            return
+        self._telemetry_stop = threading.Event()
+        self._telemetry_thread = threading.Thread(target=self._telemetry_loop, args=(self._telemetry_stop,),
+                                                  daemon=True)
+        self._telemetry_thread.start()
+    
+    def _stop_telemetry(self) -> None:
+        """Stop the telemetry thread and drop the cached snapshot."""
+        # The loop exits on its next tick; no join so disconnect never blocks on it
+        if self._telemetry_stop is not None:
+            self._telemetry_stop.set()
+        self._telemetry_stop = None
+        self._telemetry_thread = None
+        with self._latest_lock:
+            self._latest = {}
+    
+    def _telemetry_loop(self, stop: threading.Event) -> None:
+        """
+        Read vehicle telemetry at a fixed interval and store the latest values.
+        Runs in a separate thread so DroneKit attribute reads overlap with caller work.
+        """
+        while not stop.is_set():
+            vehicle = self.vehicle
+            if vehicle is None:
+                break
+            
+            try:
+                frame = vehicle.location.global_relative_frame
+                battery = vehicle.battery
+                snapshot = {
+                    "mode": vehicle.mode.name,
+                    "armed": vehicle.armed,
+                    "location": {
+                        "latitude": frame.lat,
+                        "longitude": frame.lon,
+                        "altitude": frame.alt
+                    },
+                    "battery": {
+                        "voltage": battery.voltage,
+                        "level": battery.level,
+                        "current": battery.current
+                    },
+                    "airspeed": vehicle.airspeed,
+                    "groundspeed": vehicle.groundspeed
+                }
+                with self._latest_lock:
+                    if stop.is_set():
+                        # Stopped during the read; don't repopulate the cleared snapshot
+                        break
+                    if snapshot != self._latest:
+                        self.state_seq += 1
+                    self._latest = snapshot
+            except Exception as e:
+                logger.debug("Telemetry read failed: %s", e)
+            
+            stop.wait(self.telemetry_interval)
+    
+    def _get_latest(self) -> Dict[str, Any]:
+        """Get the most recent telemetry snapshot (empty until the first read completes)."""
+        with self._latest_lock:
+            return self._latest
+    
+    def _wait_until(self, predicate: Callable[[], bool], timeout: float,
+                    start_delay: float = 0.01, max_delay: float = 0.25) -> bool:
+        """
+        Poll a condition with exponential back-off until it holds or the timeout expires.
+        
+        Args:
+            predicate: Called with no arguments, returns True once the condition holds
+            timeout: Maximum time to wait in seconds
+            start_delay: First poll interval in seconds
+            max_delay: Ceiling for the poll interval in seconds
+            
+        Returns:
+            bool: True if the condition was met, False if timeout
+        """
+        start = time.time()
+        delay = start_delay
+        while not predicate():
+            if time.time() - start > timeout:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        return True
+    
+    def _wait_mode(self, target: str, timeout: float) -> bool:
+        """
+        Switch to a flight mode and wait for the autopilot to report it.
+        The mode listener fires on the HEARTBEAT that carries the new mode.
+        
+        Args:
+            target: Mode name (GUIDED, AUTO, LAND or RTL)
+            timeout: Maximum time to wait in seconds
+            
+        Returns:
+            bool: True if the vehicle is in the target mode, False if timeout
+        """
+        if self.vehicle.mode.name == target:
+            return True
+        self.vehicle.mode = self._MODE_CACHE[target]
+        return self._wait_for_attribute('mode', lambda mode: mode.name == target, timeout)
+    
+    def _wait_for_attribute(self, attr_name: str, predicate: Callable[[Any], bool],
+                            timeout: Optional[float]) -> bool:
+        """
+        Wait until a vehicle attribute satisfies a condition.
+        
+        Uses a DroneKit attribute listener so the wait ends as soon as the MAVLink
+        message that updates the attribute is processed, instead of on the next
+        polling tick.
+        
+        Args:
+            attr_name: DroneKit attribute name (e.g. 'mode', 'armed', 'location.global_relative_frame')
+            predicate: Called with the attribute value, returns True once the condition holds
+            timeout: Maximum time to wait in seconds (None waits indefinitely)
+            
+        Returns:
+            bool: True if the condition was met, False if timeout
+        """
+        event = threading.Event()
+        
+        def listener(vehicle, name, value):
+            if predicate(value):
+                event.set()
+        
+        self.vehicle.add_attribute_listener(attr_name, listener)
+        try:
+            # Check the current value after registering so a change that landed
+            # before the listener was attached isn't missed
+            if predicate(operator.attrgetter(attr_name)(self.vehicle)):
+                return True
+            return event.wait(timeout)
+        finally:
+            self.vehicle.remove_attribute_listener(attr_name, listener)
+    
     def _wait_for_gps_lock(self, timeout: int = 30) -> bool:
         """
         Wait for GPS to get a 3D fix.
@@ -437,40 +723,29 @@ class DroneController:
             bool: True if GPS lock acquired, False if timeout
         """
         logger.info("Waiting for GPS lock...")
-        start_time = time.time()
         
-        while time.time() - start_time < timeout:
-            try:
-                # Check GPS fix type
-                # GPS fix types: 0=No GPS, 1=No Fix, 2=2D Fix, 3=3D Fix
-                if self.vehicle.gps_0:
-                    fix_type = self.vehicle.gps_0.fix_type
-                    logger.info(f"GPS Fix Type: {fix_type}")
-                    
-                    if fix_type >= 3:
-                        # 3D fix acquired
-                        satellites = self.vehicle.gps_0.satellites_visible
-                        logger.info(f"GPS Lock acquired! Satellites: {satellites}, Fix Type: {fix_type}")
-                        return True
-                    elif fix_type == 2:
-                        logger.info("2D GPS fix, waiting for 3D fix...")
-                    else:
-                        logger.info("No GPS fix yet, waiting...")
-                else:
-                    logger.info("GPS not available, waiting...")
-                
-                time.sleep(1)
-            except Exception as e:
-                logger.warning(f"Error checking GPS status: {e}")
-                time.sleep(1)
+        # GPS fix types: 0=No GPS, 1=No Fix, 2=2D Fix, 3=3D Fix
+        if not self._wait_for_attribute('gps_0', lambda gps: gps is not None and (gps.fix_type or 0) >= 3, timeout):
+            logger.error("GPS lock not acquired after %s seconds", timeout)
+            return False
         
-        logger.error(f"GPS lock not acquired after {timeout} seconds")
-        return False
+        gps = self.vehicle.gps_0
+        logger.info("GPS Lock acquired! Satellites: %s, Fix Type: %s", gps.satellites_visible, gps.fix_type)
+        return True
 
 
 # Convenience functions for using the controller without creating an instance
 
 _controller = None
+_controller_lock = threading.Lock()
+
+def _get_controller() -> DroneController:
+    """Get the shared controller, creating it on first use (thread-safe)."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = DroneController()
+        return _controller
 
 def connect_drone(connection_string: str, timeout: int = 30) -> bool:
     """
@@ -483,17 +758,11 @@ def connect_drone(connection_string: str, timeout: int = 30) -> bool:
     Returns:
         bool: True if connection successful, False otherwise
     """
-    global _controller
-    if _controller is None:
-        _controller = DroneController()
-    
-    return _controller.connect_to_drone(connection_string, timeout)
+    return _get_controller().connect_to_drone(connection_string, timeout)
 
 def disconnect_drone() -> None:
     """Disconnect from the drone."""
-    global _controller
-    if _controller:
-        _controller.disconnect()
+    _get_controller().disconnect()
 
 def takeoff(altitude: float) -> bool:
     """
@@ -505,10 +774,7 @@ def takeoff(altitude: float) -> bool:
     Returns:
         bool: True if takeoff successful, False otherwise
     """
-    global _controller
-    if _controller:
-        return _controller.arm_and_takeoff(altitude)
-    return False
+    return _get_controller().arm_and_takeoff(altitude)
 
 def land() -> bool:
     """
@@ -517,10 +783,7 @@ def land() -> bool:
     Returns:
         bool: True if land command sent successfully, False otherwise
     """
-    global _controller
-    if _controller:
-        return _controller.land()
-    return False
+    return _get_controller().land()
 
 def return_home() -> bool:
     """
@@ -529,10 +792,7 @@ def return_home() -> bool:
     Returns:
         bool: True if RTL command sent successfully, False otherwise
     """
-    global _controller
-    if _controller:
-        return _controller.return_to_launch()
-    return False
+    return _get_controller().return_to_launch()
 
 def fly_to(lat: float, lon: float, alt: float) -> bool:
     """
@@ -546,10 +806,7 @@ def fly_to(lat: float, lon: float, alt: float) -> bool:
     Returns:
         bool: True if goto command sent successfully, False otherwise
     """
-    global _controller
-    if _controller:
-        return _controller.goto_location(lat, lon, alt)
-    return False
+    return _get_controller().goto_location(lat, lon, alt)
 
 def get_location() -> Dict[str, float]:
     """
@@ -558,10 +815,7 @@ def get_location() -> Dict[str, float]:
     Returns:
         Dict containing latitude, longitude, and altitude
     """
-    global _controller
-    if _controller:
-        return _controller.get_current_location()
-    return {"error": "Not connected to drone"}
+    return _get_controller().get_current_location()
 
 def get_battery() -> Dict[str, float]:
     """
@@ -570,10 +824,7 @@ def get_battery() -> Dict[str, float]:
     Returns:
         Dict containing battery voltage and remaining percentage
     """
-    global _controller
-    if _controller:
-        return _controller.get_battery_status()
-    return {"error": "Not connected to drone"}
+    return _get_controller().get_battery_status()
 
 def execute_mission_plan(waypoints: List[Dict[str, float]]) -> bool:
     """
@@ -585,8 +836,7 @@ def execute_mission_plan(waypoints: List[Dict[str, float]]) -> bool:
     Returns:
         bool: True if mission started successfully, False otherwise
     """
-    global _controller
-    if _controller:
-        if _controller.upload_mission(waypoints):
-            return _controller.execute_mission()
+    controller = _get_controller()
+    if controller.upload_mission(waypoints):
+        return controller.execute_mission()
     return False 
\ No newline at end of file
@@ -3,7 +3,7 @@ Function calling tools for LLM to execute drone commands.
 """
 
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Callable, Optional, Union
 from .drone_control import DroneController
 
 # Define function schemas for LLMs
@@ -87,8 +87,32 @@ FUNCTION_SCHEMAS = [
 class FunctionExecutor:
     """Executes function calls from LLM on the drone."""
     
-    def __init__(self, drone_controller: Optional[DroneController] = None):
-        self.drone_controller = drone_controller
+    def __init__(self, drone_controller: Union[DroneController, Callable[[], Optional[DroneController]], None] = None):
+        """
+        Args:
+            drone_controller: The controller to command, or a zero-argument callable
+                returning the current one (looked up on every call, so one executor
+                can follow a controller that is reconnected or replaced)
+        """
+        self._controller = drone_controller
+        self._dispatch = {
+            "arm_and_takeoff": self._do_takeoff,
+            "land": self._do_land,
+            "return_to_launch": self._do_rtl,
+            "goto_location": self._do_goto,
+            "get_status": self._do_status,
+            "set_airspeed": self._do_airspeed,
+        }
+    
+    @property
+    def drone_controller(self) -> Optional[DroneController]:
+        """The controller commands are sent to."""
+        controller = self._controller
+        return controller() if callable(controller) else controller
+    
+    @drone_controller.setter
+    def drone_controller(self, value):
+        self._controller = value
     
     def execute_function(self, function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a function call and return the result."""
@@ -106,107 +130,109 @@ class FunctionExecutor:
                 "error": "Drone not connected. Please connect to the drone first."
             }
         
-        try:
-            if function_name == "arm_and_takeoff":
-                altitude = arguments.get("altitude")
-                if not altitude:
-                    return {"success": False, "error": "Missing altitude parameter"}
-                
-                success = self.drone_controller.arm_and_takeoff(altitude)
-                return {
-                    "success": success,
-                    "message": f"Successfully took off to {altitude}m! The drone is now airborne." if success else "Takeoff failed. The drone may need more time for GPS lock or system initialization."
-                }
-            
-            elif function_name == "land":
-                success = self.drone_controller.land()
-                return {
-                    "success": success,
-                    "message": "Landing initiated" if success else "Landing failed"
-                }
-            
-            elif function_name == "return_to_launch":
-                success = self.drone_controller.return_to_launch()
-                return {
-                    "success": success,
-                    "message": "Returning to launch point" if success else "Return to launch failed"
-                }
-            
-            elif function_name == "goto_location":
-                lat = arguments.get("latitude")
-                lon = arguments.get("longitude")
-                alt = arguments.get("altitude")
-                
-                if lat is None or lon is None or alt is None:
-                    return {"success": False, "error": "Missing location parameters"}
-                
-                success = self.drone_controller.goto_location(lat, lon, alt)
-                return {
-                    "success": success,
-                    "message": f"Flying to ({lat}, {lon}) at {alt}m" if success else "Navigation failed"
-                }
-            
-            elif function_name == "get_status":
-                if not self.drone_controller.vehicle:
-                    return {"success": False, "error": "Vehicle not available"}
-                
-                vehicle = self.drone_controller.vehicle
-                status = {
-                    "success": True,
-                    "mode": str(vehicle.mode.name),
-                    "armed": vehicle.armed,
-                    "altitude": vehicle.location.global_relative_frame.alt if vehicle.location else None,
-                    "battery": vehicle.battery.level if vehicle.battery else None,
-                    "gps": {
-                        "lat": vehicle.location.global_frame.lat if vehicle.location else None,
-                        "lon": vehicle.location.global_frame.lon if vehicle.location else None
-                    }
-                }
-                return status
-            
-            elif function_name == "set_airspeed":
-                speed = arguments.get("speed")
-                if not speed:
-                    return {"success": False, "error": "Missing speed parameter"}
-                
-                success = self.drone_controller.set_airspeed(speed)
-                return {
-                    "success": success,
-                    "message": f"Airspeed set to {speed} m/s" if success else "Failed to set airspeed"
-                }
-            
-            else:
-                return {
-                    "success": False,
-                    "error": f"Unknown function: {function_name}"
-                }
+        handler = self._dispatch.get(function_name)
+        if handler is None:
+            return {
+                "success": False,
+                "error": f"Unknown function: {function_name}"
+            }
         
+        try:
+            return handler(arguments)
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Error executing {function_name}: {str(e)}"
             }
+    
+    def _in_progress(self) -> bool:
+        """Whether the controller returned before the commanded manoeuvre finished (Webots)."""
+        return getattr(self.drone_controller, 'manoeuvre_in_progress', False)
+    
+    def _do_takeoff(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        altitude = arguments.get("altitude")
+        if not altitude:
+            return {"success": False, "error": "Missing altitude parameter"}
+        
+        success = self.drone_controller.arm_and_takeoff(altitude)
+        if not success:
+            message = "Takeoff failed. The drone may need more time for GPS lock or system initialization."
+        elif self._in_progress():
+            message = f"Takeoff to {altitude}m initiated. The drone is climbing."
+        else:
+            message = f"Successfully took off to {altitude}m! The drone is now airborne."
+        return {"success": success, "message": message}
+    
+    def _do_land(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        success = self.drone_controller.land()
+        return {
+            "success": success,
+            "message": "Landing initiated" if success else "Landing failed"
+        }
+    
+    def _do_rtl(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        success = self.drone_controller.return_to_launch()
+        return {
+            "success": success,
+            "message": "Returning to launch point" if success else "Return to launch failed"
+        }
+    
+    def _do_goto(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        lat = arguments.get("latitude")
+        lon = arguments.get("longitude")
+        alt = arguments.get("altitude")
+        
+        if lat is None or lon is None or alt is None:
+            return {"success": False, "error": "Missing location parameters"}
+        
+        success = self.drone_controller.goto_location(lat, lon, alt)
+        if not success:
+            message = "Navigation failed"
+        elif self._in_progress():
+            message = f"Navigation to ({lat}, {lon}) at {alt}m initiated"
+        else:
+            message = f"Flying to ({lat}, {lon}) at {alt}m"
+        return {"success": success, "message": message}
+    
+    def _do_status(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.drone_controller.vehicle:
+            return {"success": False, "error": "Vehicle not available"}
+        
+        status = {"success": True}
+        status.update(self.drone_controller.get_status_snapshot())
+        return status
+    
+    def _do_airspeed(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        speed = arguments.get("speed")
+        if not speed:
+            return {"success": False, "error": "Missing speed parameter"}
+        
+        success = self.drone_controller.set_airspeed(speed)
+        return {
+            "success": success,
+            "message": f"Airspeed set to {speed} m/s" if success else "Failed to set airspeed"
+        }
 
 
-def format_function_schemas_for_ollama(schemas: List[Dict]) -> str:
-    """Format function schemas as a string for Ollama (which doesn't support native function calling)."""
-    functions_desc = "You have access to the following drone control functions:\n\n"
+def _build_ollama_schema_text(schemas: List[Dict]) -> str:
+    """Build the Ollama function-calling prompt text for the given schemas."""
+    parts = ["You have access to the following drone control functions:\n\n"]
     
     for func in schemas:
-        functions_desc += f"**{func['name']}**\n"
-        functions_desc += f"Description: {func['description']}\n"
+        parts.append(f"**{func['name']}**\n")
+        parts.append(f"Description: {func['description']}\n")
         
         if func['parameters']['properties']:
-            functions_desc += "Parameters:\n"
+            parts.append("Parameters:\n")
             for param_name, param_info in func['parameters']['properties'].items():
                 required = " (required)" if param_name in func['parameters'].get('required', []) else ""
-                functions_desc += f"  - {param_name}: {param_info.get('description', 'No description')}{required}\n"
+                parts.append(f"  - {param_name}: {param_info.get('description', 'No description')}{required}\n")
         else:
-            functions_desc += "Parameters: None\n"
+            parts.append("Parameters: None\n")
         
-        functions_desc += "\n"
+        parts.append("\n")
     
-    functions_desc += """To execute a function, you MUST respond EXACTLY in this format:
+    parts.append("""To execute a function, you MUST respond EXACTLY in this format:
 EXECUTE_FUNCTION: function_name
 ARGUMENTS: {"param1": value1, "param2": value2}
 
@@ -219,7 +245,17 @@ EXECUTE_FUNCTION: arm_and_takeoff
 ARGUMENTS: {"altitude": 20}
 
 After executing the function, I will provide you with the result, and THEN you should explain it to the user in natural language.
-"""
+""")
     
-    return functions_desc
+    return "".join(parts)
 
+
+# FUNCTION_SCHEMAS never changes at runtime, so its prompt text is built once
+_OLLAMA_SCHEMA_TEXT = _build_ollama_schema_text(FUNCTION_SCHEMAS)
+
+
+def format_function_schemas_for_ollama(schemas: List[Dict]) -> str:
+    """Format function schemas as a string for Ollama (which doesn't support native function calling)."""
+    if schemas is FUNCTION_SCHEMAS:
+        return _OLLAMA_SCHEMA_TEXT
+    return _build_ollama_schema_text(schemas)
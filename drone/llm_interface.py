@@ -3,55 +3,305 @@ LLM Interface for DeepDrone supporting LiteLLM and Ollama.
 """
 
 import os
-from typing import List, Dict, Any, Optional
+import re
+import asyncio
+import hashlib
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Optional, Tuple
 import json
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .config import ModelConfig
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Default API endpoints used to pre-warm connections when no base_url is configured
+PROVIDER_BASE_URLS = {
+    "openai": "https://api.openai.com",
+    "anthropic": "https://api.anthropic.com",
+    "mistral": "https://api.mistral.ai",
+    "google": "https://generativelanguage.googleapis.com",
+    "gemini": "https://generativelanguage.googleapis.com",
+}
+
+# Prompt prefixes for flattening chat messages (see _messages_to_prompt)
+ROLE_PREFIX = {"system": "System: ", "user": "Human: ", "assistant": "Assistant: "}
+
+# Markers that introduce the final answer in reasoning output, in priority order
+ANSWER_MARKERS = [
+    "Final answer:",
+    "Therefore,",
+    "So the answer is",
+    "The result is",
+    "EXECUTE_FUNCTION:",  # For function calls
+]
+_ANSWER_MARKER_RE = re.compile("|".join(map(re.escape, ANSWER_MARKERS)), re.IGNORECASE)
+
+# Known LiteLLM errors: (substrings that must all appear in the lowercased error, message)
+_LITELLM_ERROR_MESSAGES = [
+    (("api key",), "API key error for {provider}. Please set your API key with: deepdrone models set-key {name}"),
+    (("quota",), "Billing/quota error for {provider}. Please check your account."),
+    (("billing",), "Billing/quota error for {provider}. Please check your account."),
+    (("model", "not found"), "Model '{model_id}' not found for {provider}."),
+]
+
+# Replies carrying this directive trigger a drone command. A paraphrase with
+# different numbers ("take off to 30 m") would replay the cached arguments, so
+# such replies are never semantically cached.
+_FUNCTION_CALL_MARKER = "EXECUTE_FUNCTION:"
+
+# User-facing error messages
+_CHAT_ERROR = "Error communicating with {p}: {e}"
+_OLLAMA_ERROR = "❌ Ollama error: {e}"
+_OLLAMA_NOT_CONNECTED = (
+    "❌ Cannot connect to Ollama.\n\n"
+    "💡 Make sure Ollama is running:\n   ollama serve\n\n"
+    "📥 Download Ollama from: https://ollama.com/download"
+)
+
+# How long the Ollama model list is trusted before being fetched again
+AVAILABLE_MODELS_TTL = 30.0
+
+class LLMCache:
+    """In-memory LRU cache of chat results keyed on the full request."""
+    
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(model_id: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """Hash the request parameters into a cache key."""
+        payload = (
+            model_id,
+            [(m["role"], m["content"]) for m in messages],
+            temperature,
+            max_tokens,
+        )
+        if orjson is not None:
+            return hashlib.blake2b(orjson.dumps(payload), digest_size=16).hexdigest()
+        return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached result and mark it as recently used."""
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        return result
+    
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result, evicting the least recently used entry when full."""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._entries.clear()
+
+
+class SemanticCache:
+    """
+    Cache that matches paraphrased prompts by embedding similarity.
+    
+    Entries are keyed on the last user message; a hit also requires the rest of the
+    conversation (system prompt, earlier turns) to be identical.
+    """
+    
+    def __init__(self, threshold: float, model_name: str = "all-MiniLM-L6-v2", max_entries: int = 512):
+        self.threshold = threshold
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._model = None
+        self._keys = None  # (N, dim) array of normalised embeddings
+        self._contexts: List[str] = []
+        self._values: List[Dict[str, Any]] = []
+        self._embed = functools.lru_cache(maxsize=1024)(self._encode)
+    
+    def _encode(self, text: str):
+        """Embed text into a unit-length vector (model loaded on first use)."""
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                raise ImportError("sentence-transformers not installed. Install with: pip install sentence-transformers")
+            self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(text, normalize_embeddings=True)
+    
+    @staticmethod
+    def split(messages: List[Dict[str, str]]):
+        """Split messages into (context key, last user message text)."""
+        if not messages or messages[-1].get("role") != "user":
+            return None, None
+        context = hashlib.sha256(json.dumps(messages[:-1], sort_keys=True).encode()).hexdigest()
+        return context, messages[-1]["content"]
+    
+    def get(self, context: str, text: str) -> Optional[Dict[str, Any]]:
+        """Get the cached result for the most similar prompt in the same context."""
+        if self._keys is None:
+            return None
+        
+        import numpy as np
+        
+        similarities = self._keys @ self._embed(text)
+        in_context = np.fromiter((c == context for c in self._contexts), dtype=bool, count=len(self._contexts))
+        similarities = np.where(in_context, similarities, -1.0)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return self._values[best]
+        return None
+    
+    def put(self, context: str, text: str, result: Dict[str, Any]) -> None:
+        """Store a result, dropping the oldest entry when full."""
+        import numpy as np
+        
+        embedding = self._embed(text)[np.newaxis, :]
+        self._keys = embedding if self._keys is None else np.vstack([self._keys, embedding])
+        self._contexts.append(context)
+        self._values.append(result)
+        if len(self._values) > self.max_entries:
+            self._keys = self._keys[1:]
+            del self._contexts[0]
+            del self._values[0]
+
+
 class LLMInterface:
     """Interface for interacting with various LLM providers."""
     
     def __init__(self, model_config: ModelConfig):
         self.model_config = model_config
-        self._setup_client()
+        # Only deterministic (temperature 0) calls are cached
+        self._cache = LLMCache()
+        self._semantic_cache = None
+        self._http = None
+        # (event loop, httpx.AsyncClient) installed as litellm.aclient_session
+        self._async_http = None
+        self._prompt_prefix_key = None
+        self._prompt_prefix = ""
+        # Last Ollama request/reply and its KV context (see _continuation_context)
+        self._ollama_session = None
+        # (event loop, AsyncClient) used by achat_with_metadata
+        self._async_ollama = None
+        # Installed Ollama models, cached so error paths don't make another RPC
+        self._available_models: List[str] = []
+        self._available_models_ts = float("-inf")
+        if model_config.semantic_cache_threshold is not None:
+            self._semantic_cache = SemanticCache(model_config.semantic_cache_threshold)
+        
+        # The provider SDK is imported on first use (see ensure_ready); litellm in
+        # particular takes over a second to import
+        self.client = None
+        self.client_type = "ollama" if model_config.provider == "ollama" else "litellm"
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._probed = False
+        if model_config.prewarm:
+            threading.Thread(target=self._prewarm, daemon=True).start()
+    
+    def ensure_ready(self) -> None:
+        """
+        Import and set up the provider client if that hasn't happened yet.
+        
+        Raises:
+            ImportError: If the provider's package is not installed
+        """
+        if self._ready:
+            return
+        with self._ready_lock:
+            if not self._ready:
+                self._setup_client()
+                self._ready = True
+    
+    def _prewarm(self):
+        """Set up the client and open the provider connection ahead of the first chat."""
+        try:
+            self.ensure_ready()
+        except ImportError as e:
+            logger.warning(str(e))
+            return
+        if self.client_type == "ollama":
+            self._probe_ollama()
+        else:
+            self._prewarm_http()
     
     def _setup_client(self):
         """Set up the appropriate client based on model provider."""
-        if self.model_config.provider == "ollama":
-            self._setup_ollama()
+        if self.client_type == "ollama":
+            self._bind_ollama()
         else:
             self._setup_litellm()
     
-    def _setup_ollama(self):
-        """Set up Ollama client."""
+    def _bind_ollama(self):
+        """Set up Ollama client (no server round trip; see _probe_ollama)."""
         try:
             import ollama
             self.client = ollama
-            self.client_type = "ollama"
             
-            # Test connection
-            try:
-                models = self.client.list()
-                available_models = models.models if hasattr(models, 'models') else []
-                logger.info(f"Connected to Ollama. Available models: {len(available_models)}")
-                
-                # Check if the requested model is available
-                model_names = [model.model for model in available_models]
-                if self.model_config.model_id not in model_names:
-                    logger.warning(f"Model '{self.model_config.model_id}' not found locally. Available models: {model_names}")
-                    
-            except Exception as e:
-                logger.warning(f"Could not connect to Ollama: {e}")
-                logger.info("Make sure Ollama is running: ollama serve")
+            # Async client class for concurrent requests (see chat_many); instances are
+            # created per event loop since their connection pool is bound to the loop
+            self.async_client_cls = ollama.AsyncClient
                 
         except ImportError:
             raise ImportError("Ollama package not installed. Install with: pip install ollama")
     
+    def _probe_ollama(self):
+        """
+        Verify Ollama is reachable and the configured model is installed.
+        
+        Runs once per interface, from the pre-warm thread or otherwise on the
+        first chat / test_connection(); failures are only logged.
+        """
+        if self._probed:
+            return
+        self._probed = True
+        try:
+            available_models = self._refresh_available_models()
+            logger.info("Connected to Ollama. Available models: %d", len(available_models))
+            logger.info(
+                "Ollama concurrency: OLLAMA_NUM_PARALLEL=%s, OLLAMA_MAX_LOADED_MODELS=%s "
+                "(set on the Ollama server to allow parallel chat_many requests)",
+                os.getenv('OLLAMA_NUM_PARALLEL', 'default'),
+                os.getenv('OLLAMA_MAX_LOADED_MODELS', 'default')
+            )
+
+            # Check if the requested model is available
+            if self.model_config.model_id not in available_models:
+                logger.warning("Model '%s' not found locally. Available models: %s", self.model_config.model_id, available_models)
+
+        except Exception as e:
+            logger.warning("Could not connect to Ollama: %s", e)
+            logger.info("Make sure Ollama is running: ollama serve")
+    
+    def _refresh_available_models(self) -> List[str]:
+        """Fetch the names of locally installed Ollama models and cache them."""
+        models = self.client.list()
+        self._available_models = [m.model for m in models.models] if hasattr(models, 'models') else []
+        self._available_models_ts = time.monotonic()
+        return self._available_models
+    
+    def _cached_available_models(self, refresh: bool = True) -> List[str]:
+        """
+        Get installed Ollama model names, from the cache while it is fresh.
+        
+        With refresh=False a stale cache is returned as is rather than fetched
+        again with a blocking request (for callers on the event loop).
+        """
+        if not refresh or time.monotonic() - self._available_models_ts < AVAILABLE_MODELS_TTL:
+            return self._available_models
+        try:
+            return self._refresh_available_models()
+        except Exception:
+            return self._available_models
+    
     def _setup_litellm(self):
         """Set up LiteLLM client."""
         try:
@@ -72,247 +322,659 @@ class LLMInterface:
             if self.model_config.base_url:
                 litellm.api_base = self.model_config.base_url
             
+            # Reuse one keep-alive connection pool across calls instead of paying a
+            # TCP + TLS handshake per completion
+            import httpx
+            self._http = httpx.Client(**self._http_options())
+            litellm.client_session = self._http
+            
             self.client = litellm
-            self.client_type = "litellm"
             
             logger.info(f"Set up LiteLLM for {self.model_config.provider}")
             
         except ImportError:
             raise ImportError("LiteLLM package not installed. Install with: pip install litellm")
     
+    def _http_options(self) -> Dict[str, Any]:
+        """Connection pool limits and timeout shared by the sync and async LiteLLM clients."""
+        import httpx
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.model_config.http_max_connections,
+                max_keepalive_connections=self.model_config.http_max_keepalive_connections
+            ),
+            "timeout": httpx.Timeout(self.model_config.http_timeout),
+        }
+    
     def chat(self, messages: List[Dict[str, str]]) -> str:
-        """Send chat messages and get response."""
+        """
+        Send chat messages and get the response text.
+        
+        This is chat_with_metadata() without the metadata; callers that need both
+        should call chat_with_metadata() once rather than each method in turn.
+        """
+        return self.chat_with_metadata(messages).get("content", "")
+    
+    def chat_with_metadata(self, messages: List[Dict[str, str]],
+                           on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Send chat messages and get response with metadata (thinking, timing, etc.).
+        
+        Args:
+            messages: Chat messages
+            on_token: Optional callback invoked with each response text chunk as it
+                      streams in
+            
+        Returns:
+            Dict with "content", plus "thinking"/"thinking_time" (Ollama) or
+            "usage"/"cost" (LiteLLM) when available; errors are flagged with "error"
+        """
+        cached, cache_keys = self._cache_lookup(messages, on_token)
+        if cached is not None:
+            return cached
+        
         try:
+            self.ensure_ready()
             if self.client_type == "ollama":
-                return self._chat_ollama(messages)
+                if not self._probed:
+                    self._probe_ollama()
+                result = self._chat_ollama_with_metadata(messages, on_token)
             else:
-                return self._chat_litellm(messages)
+                # LiteLLM has no thinking; content comes with usage/cost metadata
+                result = self._chat_litellm_with_metadata(messages, on_token)
         except Exception as e:
-            logger.error(f"Chat error: {e}")
-            return f"Error communicating with {self.model_config.provider}: {str(e)}"
+            logger.error("Chat error: %s", e)
+            return {
+                "content": _CHAT_ERROR.format_map({"p": self.model_config.provider, "e": e}),
+                "error": True
+            }
+        
+        self._cache_store(result, cache_keys)
+        return result
     
-    def chat_with_metadata(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Send chat messages and get response with metadata (thinking, timing, etc.)."""
+    async def achat_with_metadata(self, messages: List[Dict[str, str]],
+                                  on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Async chat_with_metadata() using the providers' async APIs.
+        
+        Runs on the caller's event loop instead of a worker thread; only the
+        one-off client setup and the semantic cache (embedding is CPU-bound)
+        are pushed to a thread. on_token is called on the event loop.
+        
+        Args:
+            messages: Chat messages
+            on_token: Optional callback invoked with each response text chunk
+            
+        Returns:
+            Same result dict as chat_with_metadata()
+        """
+        cached, cache_key = self._exact_lookup(messages)
+        semantic_context, semantic_text = None, None
+        if cached is None and self._semantic_cache is not None:
+            cached, semantic_context, semantic_text = await asyncio.to_thread(self._semantic_lookup, messages)
+        if cached is not None:
+            if on_token:
+                on_token(cached["content"])
+            return {**cached, "cached": True}
+        
         try:
+            if not self._ready or (self.client_type == "ollama" and not self._probed):
+                await asyncio.to_thread(self._prepare)
             if self.client_type == "ollama":
-                return self._chat_ollama_with_metadata(messages)
+                result = await self._chat_ollama_async(messages, self._loop_async_client(),
+                                                       on_token, continue_session=True)
             else:
-                # LiteLLM doesn't have thinking/metadata, just return content
-                content = self._chat_litellm(messages)
-                return {"content": content}
+                result = await self._chat_litellm_async(messages, on_token)
         except Exception as e:
-            logger.error(f"Chat error: {e}")
+            logger.error("Chat error: %s", e)
             return {
-                "content": f"Error communicating with {self.model_config.provider}: {str(e)}"
+                "content": _CHAT_ERROR.format_map({"p": self.model_config.provider, "e": e}),
+                "error": True
             }
+        
+        if not result.get("error"):
+            if cache_key is not None:
+                self._cache.put(cache_key, result)
+            if semantic_text is not None:
+                await asyncio.to_thread(self._semantic_store, semantic_context, semantic_text, result)
+        return result
+    
+    def _prepare(self):
+        """Set up the client and, for Ollama, run the one-time probe (blocking)."""
+        self.ensure_ready()
+        if self.client_type == "ollama" and not self._probed:
+            self._probe_ollama()
     
-    def _chat_ollama(self, messages: List[Dict[str, str]]) -> str:
-        """Chat using Ollama (returns only the response text)."""
-        metadata = self._chat_ollama_with_metadata(messages)
-        return metadata.get("content", "")
+    def _loop_async_client(self):
+        """Get the Ollama AsyncClient for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        if self._async_ollama is None or self._async_ollama[0] is not loop:
+            self._async_ollama = (loop, self.async_client_cls(host=self.model_config.base_url))
+        return self._async_ollama[1]
     
-    def _chat_ollama_with_metadata(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    def _loop_async_http(self):
+        """
+        Install a pooled httpx.AsyncClient for the running event loop as
+        litellm.aclient_session, creating it on first use.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_http is None or self._async_http[0] is not loop:
+            import httpx
+            self._async_http = (loop, httpx.AsyncClient(**self._http_options()))
+        self.client.aclient_session = self._async_http[1]
+    
+    def _cache_lookup(self, messages: List[Dict[str, str]],
+                      on_token: Optional[Callable[[str], None]] = None):
+        """
+        Look messages up in the exact and semantic caches.
+        
+        Returns:
+            Tuple of (cached result or None, keys to pass to _cache_store)
+        """
+        cached, cache_key = self._exact_lookup(messages)
+        semantic_context, semantic_text = None, None
+        if cached is None:
+            cached, semantic_context, semantic_text = self._semantic_lookup(messages)
+        if cached is not None:
+            if on_token:
+                on_token(cached["content"])
+            return {**cached, "cached": True}, None
+        
+        return None, (cache_key, semantic_context, semantic_text)
+    
+    def _exact_lookup(self, messages: List[Dict[str, str]]):
+        """
+        Look messages up in the exact-match LRU (cheap enough for the event loop).
+        
+        Returns:
+            Tuple of (cached result or None, cache key or None if uncacheable)
+        """
+        if self.model_config.temperature != 0:
+            return None, None
+        cache_key = LLMCache.make_key(
+            self.model_config.model_id,
+            messages,
+            self.model_config.temperature,
+            self.model_config.max_tokens
+        )
+        return self._cache.get(cache_key), cache_key
+    
+    def _semantic_lookup(self, messages: List[Dict[str, str]]):
+        """
+        Look messages up in the semantic cache (blocking: may load the embedding model).
+        
+        Returns:
+            Tuple of (cached result or None, context key, last user message text)
+        """
+        if self._semantic_cache is None:
+            return None, None, None
+        semantic_context, semantic_text = SemanticCache.split(messages)
+        if semantic_text is None:
+            return None, None, None
+        try:
+            cached = self._semantic_cache.get(semantic_context, semantic_text)
+        except Exception as e:
+            logger.warning("Semantic cache disabled: %s", e)
+            self._semantic_cache = None
+            return None, None, None
+        return cached, semantic_context, semantic_text
+    
+    def _cache_store(self, result: Dict[str, Any], cache_keys) -> None:
+        """Cache a successful result under the keys from _cache_lookup."""
+        if result.get("error"):
+            return
+        cache_key, semantic_context, semantic_text = cache_keys
+        if cache_key is not None:
+            self._cache.put(cache_key, result)
+        if semantic_text is not None:
+            self._semantic_store(semantic_context, semantic_text, result)
+    
+    def _semantic_store(self, semantic_context: str, semantic_text: str, result: Dict[str, Any]) -> None:
+        """Add a result to the semantic cache (blocking: embeds the prompt)."""
+        if self._semantic_cache is None or _FUNCTION_CALL_MARKER in result.get("content", ""):
+            return
+        try:
+            self._semantic_cache.put(semantic_context, semantic_text, result)
+        except Exception as e:
+            logger.warning("Semantic cache disabled: %s", e)
+            self._semantic_cache = None
+    
+    def chat_many(self, batch: List[List[Dict[str, str]]]) -> List[Dict[str, Any]]:
+        """
+        Send several independent conversations concurrently.
+        
+        Requests run in parallel, so the batch completes in roughly the time of the
+        slowest request. Ollama serves up to OLLAMA_NUM_PARALLEL requests at once and
+        queues the rest. Must not be called from inside a running event loop.
+        
+        Args:
+            batch: List of message lists, one per conversation
+            
+        Returns:
+            List of result dicts (same shape as chat_with_metadata), in batch order
+        """
+        self.ensure_ready()
+        return asyncio.run(self._chat_many_async(batch))
+    
+    async def _chat_many_async(self, batch: List[List[Dict[str, str]]]) -> List[Dict[str, Any]]:
+        """Run a batch of conversations concurrently on the current event loop."""
+        if self.client_type == "ollama":
+            async_client = self.async_client_cls(host=self.model_config.base_url)
+            tasks = [self._chat_ollama_async(messages, async_client) for messages in batch]
+        else:
+            tasks = [self._chat_litellm_async(messages) for messages in batch]
+        try:
+            return list(await asyncio.gather(*tasks))
+        finally:
+            # asyncio.run ends this loop with the batch; close the async session bound to it
+            if self._async_http is not None and self._async_http[0] is asyncio.get_running_loop():
+                async_http = self._async_http[1]
+                self._async_http = None
+                if getattr(self.client, "aclient_session", None) is async_http:
+                    self.client.aclient_session = None
+                await async_http.aclose()
+    
+    def _chat_ollama_with_metadata(self, messages: List[Dict[str, str]],
+                                   on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """Chat using Ollama with full metadata."""
         try:
-            # Convert messages to Ollama format
-            prompt = self._messages_to_prompt(messages)
+            prompt, context = self._ollama_request(messages)
 
-            logger.info(f"Sending to Ollama model '{self.model_config.model_id}' (prompt length: {len(prompt)})")
+            logger.debug("Sending to Ollama model '%s' (prompt length: %d)", self.model_config.model_id, len(prompt))
 
-            response = self.client.generate(
+            # Streaming avoids the long stalls some Ollama versions show in the
+            # non-streaming path, and lets callers render tokens as they arrive
+            stream = self.client.generate(
                 model=self.model_config.model_id,
                 prompt=prompt,
-                options={
-                    'temperature': self.model_config.temperature,
-                    'num_predict': self.model_config.max_tokens,
-                }
+                options=self._ollama_options(),
+                context=context,
+                stream=True
             )
-
-            logger.info(f"Ollama response type: {type(response)}")
-            logger.info(f"Ollama response has attributes: {hasattr(response, 'response')}, {hasattr(response, 'thinking')}, {hasattr(response, 'context')}")
-            
-            # Extract data from Ollama GenerateResponse object
-            # The response object has: response, thinking, context, and other metadata
-            if hasattr(response, 'response'):
-                # It's an Ollama GenerateResponse object
-                main_response = response.response if response.response else ''
-                thinking = response.thinking if hasattr(response, 'thinking') and response.thinking else ''
-                
-                # Get timing info
-                eval_duration = getattr(response, 'eval_duration', 0)
-                thinking_time = round(eval_duration / 1_000_000_000, 1) if eval_duration else 0
-                
-                logger.info(f"Extracted from GenerateResponse: response_len={len(main_response)}, thinking_len={len(thinking)}, time={thinking_time}s")
-            elif isinstance(response, dict):
-                # It's a dict (older Ollama versions or different API)
-                main_response = response.get('response', '')
-                thinking = response.get('thinking', '')
-                eval_duration = response.get('eval_duration', 0)
-                thinking_time = round(eval_duration / 1_000_000_000, 1) if eval_duration else 0
-                
-                logger.info(f"Extracted from dict: response_len={len(main_response)}, thinking_len={len(thinking)}, time={thinking_time}s")
-            else:
-                # Unexpected format - log and convert to string
-                logger.error(f"Unexpected Ollama response type: {type(response)}")
-                logger.error(f"Response value: {str(response)[:500]}")
-                main_response = str(response)
-                thinking = ''
-                thinking_time = 0
-
-            logger.info(f"Main response length: {len(main_response)}, Thinking length: {len(thinking)}, Time: {thinking_time}s")
-            logger.info(f"Main response preview: {main_response[:200] if main_response else 'EMPTY'}")
-
-            # Handle reasoning models (like qwen3) that put everything in thinking field
-            if not main_response and thinking:
-                logger.info("Response field is empty, extracting answer from thinking field")
-                # The thinking contains the reasoning process
-                # We'll use it as-is for now, but store it as thinking
-                # The actual final answer is usually at the end or marked
-                
-                # Try to extract just the final answer if there's a clear pattern
-                final_answer = self._extract_final_answer(thinking)
-                
-                if final_answer and len(final_answer) < len(thinking) * 0.8:
-                    # We found a concise answer
-                    main_response = final_answer
-                    # Keep full thinking for the collapsible section
-                else:
-                    # No clear answer extraction, use the whole thinking as response
-                    # This means the UI will show the full reasoning
-                    main_response = thinking
-                    # Don't duplicate thinking in metadata
-                    thinking = ""
-
-            if not main_response:
-                logger.warning("Empty response from Ollama!")
-                main_response = "The AI model returned an empty response. Please try again."
-
-            # Prepare result - ONLY include the actual response text
-            result = {"content": main_response.strip()}
-            
-            # Add thinking metadata if available and different from main response
-            if thinking and thinking != main_response:
-                result["thinking"] = thinking.strip()
-                result["thinking_time"] = thinking_time
-
-            logger.info(f"Returning result with content length: {len(result['content'])}, has_thinking: {bool(thinking)}")
-            return result
+            accumulated = self._new_stream_accumulator()
+            for chunk in stream:
+                self._accumulate_ollama_chunk(accumulated, chunk, on_token)
+            return self._finish_ollama_session(messages, self._finish_stream(accumulated))
             
         except Exception as e:
-            error_str = str(e).lower()
-            
-            if "model not found" in error_str or "model does not exist" in error_str:
-                available_models = []
-                try:
-                    models = self.client.list()
-                    available_models = [m.model for m in models.models] if hasattr(models, 'models') else []
-                except:
-                    pass
-                
-                error_msg = f"❌ Model '{self.model_config.model_id}' not found in Ollama.\n\n"
-                
-                if available_models:
-                    error_msg += f"📋 Available local models:\n"
-                    for model in available_models:
-                        error_msg += f"  • {model}\n"
-                    error_msg += f"\n💡 To install {self.model_config.model_id}, run:\n"
-                    error_msg += f"   ollama pull {self.model_config.model_id}\n"
-                else:
-                    error_msg += "📭 No models found locally.\n\n"
-                    error_msg += f"💡 To install {self.model_config.model_id}, run:\n"
-                    error_msg += f"   ollama pull {self.model_config.model_id}\n\n"
-                    error_msg += "🎯 Popular models to try:\n"
-                    error_msg += "   • ollama pull llama3.1\n"
-                    error_msg += "   • ollama pull codestral\n"
-                    error_msg += "   • ollama pull qwen2.5-coder\n"
-                
-                return {"content": error_msg}
+            return self._ollama_error_result(e)
+    
+    def _ollama_request(self, messages: List[Dict[str, str]]) -> Tuple[str, Optional[List[int]]]:
+        """Build the Ollama prompt and the KV context to resume from (if any)."""
+        # Continue from the previous turn's KV context when possible so Ollama
+        # only prefills the new turn instead of the whole conversation
+        context = self._continuation_context(messages)
+        if context is not None:
+            return "\n\n" + ROLE_PREFIX["user"] + messages[-1]["content"] + "\n\nAssistant: ", context
+        # Convert messages to Ollama format
+        return self._messages_to_prompt(messages), None
+    
+    def _finish_ollama_session(self, messages: List[Dict[str, str]], response: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse a finished Ollama response and remember it for the next turn's continuation."""
+        result = self._parse_ollama_response(response)
+        if response["context"]:
+            self._ollama_session = {
+                "messages": list(messages),
+                "content": result["content"],
+                "context": response["context"],
+            }
+        else:
+            self._ollama_session = None
+        return result
+    
+    def _continuation_context(self, messages: List[Dict[str, str]]) -> Optional[List[int]]:
+        """
+        Get the Ollama context to resume from, if messages extend the previous call.
+        
+        The context is only reused when messages are exactly the previous request
+        plus the assistant reply it produced and one new user turn; any other
+        change (e.g. a different system prompt) falls back to a full prompt.
+        
+        Args:
+            messages: Conversation for the upcoming request
             
-            elif "connection" in error_str or "refused" in error_str:
-                return {"content": "❌ Cannot connect to Ollama.\n\n💡 Make sure Ollama is running:\n   ollama serve\n\n📥 Download Ollama from: https://ollama.com/download"}
+        Returns:
+            Token context from the previous response, or None
+        """
+        session = self._ollama_session
+        if session is None:
+            return None
+        
+        previous = session["messages"]
+        if (len(messages) == len(previous) + 2
+                and messages[-2] == {"role": "assistant", "content": session["content"]}
+                and messages[-1]["role"] == "user"
+                and messages[:len(previous)] == previous):
+            return session["context"]
+        return None
+    
+    async def _chat_ollama_async(self, messages: List[Dict[str, str]], async_client,
+                                 on_token: Optional[Callable[[str], None]] = None,
+                                 continue_session: bool = False) -> Dict[str, Any]:
+        """
+        Chat using an Ollama AsyncClient with full metadata.
+        
+        continue_session resumes from (and updates) the KV context of the previous
+        turn like the sync path; chat_many leaves it off since its conversations
+        are independent.
+        """
+        try:
+            if continue_session:
+                prompt, context = self._ollama_request(messages)
+            else:
+                prompt, context = self._messages_to_prompt(messages), None
+            stream = await async_client.generate(
+                model=self.model_config.model_id,
+                prompt=prompt,
+                options=self._ollama_options(),
+                context=context,
+                stream=True
+            )
+            accumulated = self._new_stream_accumulator()
+            async for chunk in stream:
+                self._accumulate_ollama_chunk(accumulated, chunk, on_token)
+            response = self._finish_stream(accumulated)
+            if continue_session:
+                return self._finish_ollama_session(messages, response)
+            return self._parse_ollama_response(response)
             
-            return {"content": f"❌ Ollama error: {str(e)}"}
+        except Exception as e:
+            # Runs on the event loop: list models from the cache only
+            return self._ollama_error_result(e, refresh_models=False)
+    
+    def _ollama_options(self) -> Dict[str, Any]:
+        """Generation options passed to Ollama."""
+        return {
+            'temperature': self.model_config.temperature,
+            'num_predict': self.model_config.max_tokens,
+        }
+    
+    def _new_stream_accumulator(self) -> Dict[str, Any]:
+        """Create the state used to collect a streamed Ollama response."""
+        return {"response": [], "thinking": [], "eval_duration": 0, "prompt_eval_duration": 0, "context": None}
+    
+    def _accumulate_ollama_chunk(self, accumulated: Dict[str, Any], chunk,
+                                 on_token: Optional[Callable[[str], None]] = None) -> None:
+        """Fold one streamed chunk (GenerateResponse object or dict) into the accumulator."""
+        if isinstance(chunk, dict):
+            text = chunk.get('response') or ''
+            thinking = chunk.get('thinking') or ''
+            eval_duration = chunk.get('eval_duration')
+            prompt_eval_duration = chunk.get('prompt_eval_duration')
+            context = chunk.get('context')
+        else:
+            text = getattr(chunk, 'response', None) or ''
+            thinking = getattr(chunk, 'thinking', None) or ''
+            eval_duration = getattr(chunk, 'eval_duration', None)
+            prompt_eval_duration = getattr(chunk, 'prompt_eval_duration', None)
+            context = getattr(chunk, 'context', None)
+        
+        if text:
+            accumulated["response"].append(text)
+            if on_token:
+                on_token(text)
+        if thinking:
+            accumulated["thinking"].append(thinking)
+        # Timing is only reported on the final chunk
+        if eval_duration:
+            accumulated["eval_duration"] = eval_duration
+        if prompt_eval_duration:
+            accumulated["prompt_eval_duration"] = prompt_eval_duration
+        if context:
+            accumulated["context"] = context
+    
+    def _finish_stream(self, accumulated: Dict[str, Any]) -> Dict[str, Any]:
+        """Join accumulated chunks into a dict shaped like a non-streamed response."""
+        return {
+            "response": "".join(accumulated["response"]),
+            "thinking": "".join(accumulated["thinking"]),
+            "eval_duration": accumulated["eval_duration"],
+            "prompt_eval_duration": accumulated["prompt_eval_duration"],
+            "context": accumulated["context"],
+        }
+    
+    def _parse_ollama_response(self, response) -> Dict[str, Any]:
+        """Convert an Ollama generate response into a result dict with content and thinking."""
+        # Streamed responses are accumulated into a dict (see _finish_stream), so
+        # check for that first; GenerateResponse objects are still accepted
+        if isinstance(response, dict):
+            # It's a dict (streamed, older Ollama versions or different API)
+            main_response = response.get('response') or ''
+            thinking = response.get('thinking') or ''
+            eval_duration = response.get('eval_duration', 0)
+            thinking_time = round(eval_duration / 1_000_000_000, 1) if eval_duration else 0
+        elif hasattr(response, 'response'):
+            # It's an Ollama GenerateResponse object
+            main_response = response.response or ''
+            thinking = getattr(response, 'thinking', None) or ''
+            eval_duration = getattr(response, 'eval_duration', 0)
+            thinking_time = round(eval_duration / 1_000_000_000, 1) if eval_duration else 0
+        else:
+            # Unexpected format - log and convert to string
+            logger.error("Unexpected Ollama response type: %s", type(response))
+            logger.error("Response value: %s", str(response)[:500])
+            main_response = str(response)
+            thinking = ''
+            thinking_time = 0
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ollama response length: %d, thinking length: %d, time: %ss",
+                         len(main_response), len(thinking), thinking_time)
+            logger.debug("Ollama response preview: %s", main_response[:200] if main_response else 'EMPTY')
+
+        # Handle reasoning models (like qwen3) that put everything in thinking field
+        if not main_response and thinking:
+            logger.debug("Response field is empty, extracting answer from thinking field")
+            # The thinking contains the reasoning process
+            # We'll use it as-is for now, but store it as thinking
+            # The actual final answer is usually at the end or marked
+
+            # Try to extract just the final answer if there's a clear pattern
+            final_answer = self._extract_final_answer(thinking)
+
+            if final_answer and len(final_answer) < len(thinking) * 0.8:
+                # We found a concise answer
+                main_response = final_answer
+                # Keep full thinking for the collapsible section
+            else:
+                # No clear answer extraction, use the whole thinking as response
+                # This means the UI will show the full reasoning
+                main_response = thinking
+                # Don't duplicate thinking in metadata
+                thinking = ""
+
+        if not main_response:
+            logger.warning("Empty response from Ollama!")
+            main_response = "The AI model returned an empty response. Please try again."
+
+        # Prepare result - ONLY include the actual response text
+        result = {"content": main_response.strip()}
+
+        # Add thinking metadata if available and different from main response
+        if thinking and thinking != main_response:
+            result["thinking"] = thinking.strip()
+            result["thinking_time"] = thinking_time
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Returning result with content length: %d, has_thinking: %s",
+                         len(result['content']), bool(thinking))
+        return result
+    
+    def _ollama_error_result(self, e: Exception, refresh_models: bool = True) -> Dict[str, Any]:
+        """
+        Build a user-facing result dict for an Ollama error.
+        
+        refresh_models=False lists installed models from the cache without a
+        blocking refresh (see _cached_available_models).
+        """
+        error_str = str(e).lower()
+
+        if "model not found" in error_str or "model does not exist" in error_str:
+            available_models = self._cached_available_models(refresh=refresh_models)
+
+            error_msg = f"❌ Model '{self.model_config.model_id}' not found in Ollama.\n\n"
+
+            if available_models:
+                error_msg += f"📋 Available local models:\n"
+                for model in available_models:
+                    error_msg += f"  • {model}\n"
+                error_msg += f"\n💡 To install {self.model_config.model_id}, run:\n"
+                error_msg += f"   ollama pull {self.model_config.model_id}\n"
+            else:
+                error_msg += "📭 No models found locally.\n\n"
+                error_msg += f"💡 To install {self.model_config.model_id}, run:\n"
+                error_msg += f"   ollama pull {self.model_config.model_id}\n\n"
+                error_msg += "🎯 Popular models to try:\n"
+                error_msg += "   • ollama pull llama3.1\n"
+                error_msg += "   • ollama pull codestral\n"
+                error_msg += "   • ollama pull qwen2.5-coder\n"
+
+            return {"content": error_msg, "error": True}
+
+        elif "connection" in error_str or "refused" in error_str:
+            return {"content": _OLLAMA_NOT_CONNECTED, "error": True}
+
+        return {"content": _OLLAMA_ERROR.format_map({"e": e}), "error": True}
     
     def _extract_final_answer(self, thinking: str) -> str:
         """Extract the final answer from thinking/reasoning text."""
-        # Common patterns for final answers in reasoning models
-        patterns = [
-            "Final answer:",
-            "Therefore,",
-            "So the answer is",
-            "The result is",
-            "EXECUTE_FUNCTION:",  # For function calls
-        ]
-        
-        thinking_lower = thinking.lower()
+        # Position of the first occurrence of each marker, found in a single
+        # case-insensitive pass without lowercasing a copy of the text
+        first_seen = {}
+        for match in _ANSWER_MARKER_RE.finditer(thinking):
+            first_seen.setdefault(match.group(0).lower(), match.start())
         
         # Look for function calls first
-        if "execute_function:" in thinking_lower:
+        if "execute_function:" in first_seen:
             # This is a function call, return the whole thing
             return thinking
         
         # Look for explicit answer markers
-        for pattern in patterns:
-            if pattern.lower() in thinking_lower:
-                # Find the position and extract from there
-                idx = thinking_lower.find(pattern.lower())
-                if idx != -1:
-                    answer = thinking[idx:].strip()
-                    # Take the first paragraph after the marker
-                    lines = answer.split('\n')
-                    # Take up to 5 lines or until empty line
-                    result_lines = []
-                    for line in lines[:10]:
-                        if line.strip():
-                            result_lines.append(line)
-                        elif result_lines:  # Empty line after content
-                            break
-                    if result_lines:
-                        return '\n'.join(result_lines)
+        for pattern in ANSWER_MARKERS:
+            # Find the position and extract from there
+            idx = first_seen.get(pattern.lower())
+            if idx is not None:
+                answer = thinking[idx:].strip()
+                # Take the first paragraph after the marker
+                lines = answer.split('\n')
+                # Take up to 5 lines or until empty line
+                result_lines = []
+                for line in lines[:10]:
+                    if line.strip():
+                        result_lines.append(line)
+                    elif result_lines:  # Empty line after content
+                        break
+                if result_lines:
+                    return '\n'.join(result_lines)
         
         # No clear pattern found, return empty to use full thinking
         return ""
     
-    def _chat_litellm(self, messages: List[Dict[str, str]]) -> str:
-        """Chat using LiteLLM."""
+    def _chat_litellm_with_metadata(self, messages: List[Dict[str, str]],
+                                    on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Chat using LiteLLM, returning a result dict (known errors are flagged with "error")."""
         try:
             response = self.client.completion(
                 model=self.model_config.model_id,
                 messages=messages,
                 max_tokens=self.model_config.max_tokens,
                 temperature=self.model_config.temperature,
+                stream=on_token is not None,
             )
             
-            return response.choices[0].message.content
+            if on_token is not None:
+                # Relay deltas as they arrive, then rebuild a regular response so
+                # usage and cost are computed as for a non-streamed call
+                chunks = []
+                for chunk in response:
+                    chunks.append(chunk)
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        on_token(text)
+                response = self.client.stream_chunk_builder(chunks, messages=messages)
+            
+            return self._litellm_result(response)
             
         except Exception as e:
-            if "api key" in str(e).lower():
-                return f"API key error for {self.model_config.provider}. Please set your API key with: deepdrone models set-key {self.model_config.name}"
-            elif "quota" in str(e).lower() or "billing" in str(e).lower():
-                return f"Billing/quota error for {self.model_config.provider}. Please check your account."
-            elif "model" in str(e).lower() and "not found" in str(e).lower():
-                return f"Model '{self.model_config.model_id}' not found for {self.model_config.provider}."
+            message = self._litellm_error_message(e)
+            if message is None:
+                raise e
+            return {"content": message, "error": True}
+    
+    async def _chat_litellm_async(self, messages: List[Dict[str, str]],
+                                  on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Chat using LiteLLM's async completion API."""
+        self._loop_async_http()
+        try:
+            response = await self.client.acompletion(
+                model=self.model_config.model_id,
+                messages=messages,
+                max_tokens=self.model_config.max_tokens,
+                temperature=self.model_config.temperature,
+                stream=on_token is not None,
+            )
+            if on_token is not None:
+                chunks = []
+                async for chunk in response:
+                    chunks.append(chunk)
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        on_token(text)
+                response = self.client.stream_chunk_builder(chunks, messages=messages)
+            return self._litellm_result(response)
             
-            raise e
+        except Exception as e:
+            message = self._litellm_error_message(e)
+            if message is None:
+                logger.error("Chat error: %s", e)
+                message = _CHAT_ERROR.format_map({"p": self.model_config.provider, "e": e})
+            return {"content": message, "error": True}
+    
+    def _litellm_result(self, response) -> Dict[str, Any]:
+        """Build a result dict with content, token usage and cost from a LiteLLM response."""
+        result = {"content": response.choices[0].message.content}
+        
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            result["usage"] = usage.model_dump() if hasattr(usage, "model_dump") else dict(usage)
+        try:
+            result["cost"] = self.client.completion_cost(completion_response=response)
+        except Exception:
+            # Pricing is unknown for custom/local models
+            pass
+        return result
+    
+    def _litellm_error_message(self, e: Exception) -> Optional[str]:
+        """Map a known LiteLLM error to a user-facing message (None if unrecognised)."""
+        error_str = str(e).lower()
+        for needles, template in _LITELLM_ERROR_MESSAGES:
+            if all(needle in error_str for needle in needles):
+                return template.format(
+                    provider=self.model_config.provider,
+                    name=self.model_config.name,
+                    model_id=self.model_config.model_id
+                )
+        return None
     
     def _messages_to_prompt(self, messages: List[Dict[str, str]]) -> str:
         """Convert messages to a single prompt for models that don't support chat format."""
-        prompt_parts = []
-        
-        for message in messages:
-            role = message["role"]
-            content = message["content"]
-            
-            if role == "system":
-                prompt_parts.append(f"System: {content}")
-            elif role == "user":
-                prompt_parts.append(f"Human: {content}")
-            elif role == "assistant":
-                prompt_parts.append(f"Assistant: {content}")
+        # Leading system messages rarely change within a session, so their rendered
+        # prefix is reused and only the rest of the conversation is joined per call
+        split = 0
+        while split < len(messages) and messages[split]["role"] == "system":
+            split += 1
         
-        prompt_parts.append("Assistant: ")
+        system_key = tuple(m["content"] for m in messages[:split])
+        if system_key != self._prompt_prefix_key:
+            self._prompt_prefix_key = system_key
+            self._prompt_prefix = "".join(ROLE_PREFIX["system"] + c + "\n\n" for c in system_key)
         
-        return "\n\n".join(prompt_parts)
+        body = "\n\n".join(
+            ROLE_PREFIX[m["role"]] + m["content"] for m in messages[split:] if m["role"] in ROLE_PREFIX
+        )
+        if body:
+            return self._prompt_prefix + body + "\n\nAssistant: "
+        return self._prompt_prefix + "Assistant: "
     
     def test_connection(self) -> Dict[str, Any]:
         """Test connection to the LLM service."""
@@ -338,6 +1000,48 @@ class LLMInterface:
                 "model": self.model_config.model_id
             }
     
+    def _prewarm_http(self):
+        """Open a keep-alive connection to the provider endpoint before the first chat."""
+        url = self.model_config.base_url or PROVIDER_BASE_URLS.get(self.model_config.provider)
+        if not url or self._http is None:
+            return
+        try:
+            self._http.head(url, timeout=5)
+            logger.debug("Pre-warmed connection to %s", url)
+        except Exception as e:
+            logger.debug("Connection pre-warm to %s failed: %s", url, e)
+    
+    def close(self) -> None:
+        """Release the HTTP connection pool (the async one is released by aclose)."""
+        if self._async_http is not None and getattr(self.client, "aclient_session", None) is self._async_http[1]:
+            self.client.aclient_session = None
+        if self._http is not None:
+            if getattr(self.client, "client_session", None) is self._http:
+                self.client.client_session = None
+            self._http.close()
+            self._http = None
+    
+    async def aclose(self) -> None:
+        """Release the event loop's async clients used by achat_with_metadata."""
+        if self._async_ollama is not None:
+            loop, async_client = self._async_ollama
+            self._async_ollama = None
+            if loop is asyncio.get_running_loop():
+                await async_client.close()
+        if self._async_http is not None:
+            loop, async_http = self._async_http
+            self._async_http = None
+            if getattr(self.client, "aclient_session", None) is async_http:
+                self.client.aclient_session = None
+            if loop is asyncio.get_running_loop():
+                await async_http.aclose()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model."""
         info = {
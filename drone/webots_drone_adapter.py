@@ -5,11 +5,162 @@ This allows seamless switching between DroneKit (real drone/SITL) and Webots sim
 
 import time
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 from .webots_udp_control import WebotsUDPController
 
 logger = logging.getLogger('webots_adapter')
 
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9000
+
+
+class _Mode:
+    __slots__ = ('name',)
+    
+    def __init__(self, name=None):
+        self.name = name
+
+
+class _Frame:
+    __slots__ = ('alt', 'lat', 'lon')
+    
+    def __init__(self, alt=0.0, lat=0.0, lon=0.0):
+        self.alt = alt
+        self.lat = lat
+        self.lon = lon
+
+
+class _Location:
+    __slots__ = ('global_relative_frame', 'global_frame')
+    
+    def __init__(self):
+        self.global_relative_frame = _Frame()
+        self.global_frame = _Frame()
+
+
+class _Battery:
+    __slots__ = ()
+    voltage = 12.6
+    level = 100.0
+    current = 5.0
+
+
+class _Status:
+    __slots__ = ('state',)
+    
+    def __init__(self, state="STANDBY"):
+        self.state = state
+
+
+class _GPS:
+    __slots__ = ()
+    fix_type = 3  # 3D fix
+    satellites_visible = 10
+    eph = 100
+    epv = 100
+
+
+class _Home:
+    __slots__ = ()
+    lat = 0.0
+    lon = 0.0
+
+
+class _MockVehicle:
+    """
+    Mock vehicle exposing the DroneKit Vehicle attributes the app reads.
+    
+    Attribute objects are created once and updated in place on access, since
+    telemetry loops read them many times per second.
+    """
+    __slots__ = ('adapter', '_mode', '_location', '_status')
+    
+    _battery = _Battery()
+    _gps = _GPS()
+    _home = _Home()
+    
+    def __init__(self, adapter):
+        self.adapter = adapter
+        self._mode = _Mode()
+        self._location = _Location()
+        self._status = _Status()
+    
+    @property
+    def mode(self):
+        self._mode.name = self.adapter.controller.simulated_mode
+        return self._mode
+    
+    @mode.setter
+    def mode(self, value):
+        # Accept VehicleMode objects or strings
+        mode_name = value.name if hasattr(value, 'name') else str(value)
+        self.adapter.controller.simulated_mode = mode_name
+    
+    @property
+    def armed(self):
+        return self.adapter.controller.simulated_armed
+    
+    @armed.setter
+    def armed(self, value):
+        self.adapter.controller.simulated_armed = value
+    
+    @property
+    def is_armable(self):
+        return self.adapter.connected
+    
+    @property
+    def location(self):
+        altitude = self.adapter.controller.simulated_altitude
+        self._location.global_relative_frame.alt = altitude
+        self._location.global_frame.alt = altitude
+        return self._location
+    
+    @property
+    def battery(self):
+        return self._battery
+    
+    @property
+    def airspeed(self):
+        return 0.0
+    
+    @property
+    def groundspeed(self):
+        return 0.0
+    
+    @property
+    def heading(self):
+        return 0
+    
+    @property
+    def system_status(self):
+        self._status.state = "ACTIVE" if self.adapter.connected else "STANDBY"
+        return self._status
+    
+    @property
+    def gps_0(self):
+        return self._gps
+    
+    @property
+    def home_location(self):
+        return self._home
+    
+    def simple_takeoff(self, altitude):
+        """Mock simple_takeoff for compatibility."""
+        pass
+    
+    def simple_goto(self, location):
+        """Mock simple_goto for compatibility."""
+        pass
+    
+    def close(self):
+        """Mock close for compatibility."""
+        self.adapter.disconnect()
+    
+    def flush(self):
+        """Mock flush for compatibility."""
+        pass
+
 
 class WebotsDroneAdapter:
     """
@@ -25,142 +176,77 @@ class WebotsDroneAdapter:
             connection_string: Format "udp:host:port" or just "webots" for defaults
                               e.g., "udp:127.0.0.1:9000" or "webots"
         """
-        # Parse connection string
-        host = "127.0.0.1"
-        port = 9000
-        
-        if connection_string and connection_string != "webots":
-            parts = connection_string.replace("udp:", "").split(":")
-            if len(parts) >= 1 and parts[0]:
-                host = parts[0]
-            if len(parts) >= 2:
-                try:
-                    port = int(parts[1])
-                except ValueError:
-                    logger.warning(f"Invalid port in connection string: {parts[1]}, using default 9000")
-        
+        host, port = self._parse(connection_string)
         self.controller = WebotsUDPController(host=host, port=port, update_rate_hz=30.0)
         self.connection_string = connection_string or "webots"
         self.connected = False
         
+        # Last controller.get_status() result, reused for one update interval so a
+        # burst of telemetry reads shares a single snapshot
+        self._status_cache = None
+        self._status_ts = 0.0
+        
+        # Simulated state last reported through state_seq
+        self._seq_state = None
+        self._state_seq = 0
+        
         # Simulated vehicle state for compatibility
         self.vehicle = None
         self._create_mock_vehicle()
     
-    def _create_mock_vehicle(self):
-        """Create a mock vehicle object with minimal attributes for compatibility."""
-        class MockVehicle:
-            def __init__(self, adapter):
-                self.adapter = adapter
-                
-            @property
-            def mode(self):
-                class Mode:
-                    def __init__(self, name):
-                        self.name = name
-                return Mode(self.adapter.controller.simulated_mode)
-            
-            @mode.setter
-            def mode(self, value):
-                # Accept VehicleMode objects or strings
-                mode_name = value.name if hasattr(value, 'name') else str(value)
-                self.adapter.controller.simulated_mode = mode_name
-            
-            @property
-            def armed(self):
-                return self.adapter.controller.simulated_armed
-            
-            @armed.setter
-            def armed(self, value):
-                self.adapter.controller.simulated_armed = value
-            
-            @property
-            def is_armable(self):
-                return self.adapter.connected
-            
-            @property
-            def location(self):
-                adapter = self.adapter  # Capture adapter reference
-                
-                class Frame:
-                    def __init__(self, alt=0.0, lat=0.0, lon=0.0):
-                        self.alt = alt
-                        self.lat = lat
-                        self.lon = lon
-                
-                class Location:
-                    def __init__(self, altitude):
-                        self._altitude = altitude
-                    
-                    @property
-                    def global_relative_frame(self):
-                        return Frame(alt=self._altitude)
-                    
-                    @property
-                    def global_frame(self):
-                        return Frame(lat=0.0, lon=0.0, alt=self._altitude)
-                
-                return Location(adapter.controller.simulated_altitude)
-            
-            @property
-            def battery(self):
-                class Battery:
-                    voltage = 12.6
-                    level = 100.0
-                    current = 5.0
-                return Battery()
-            
-            @property
-            def airspeed(self):
-                return 0.0
-            
-            @property
-            def groundspeed(self):
-                return 0.0
-            
-            @property
-            def heading(self):
-                return 0
-            
-            @property
-            def system_status(self):
-                class Status:
-                    state = "ACTIVE" if self.adapter.connected else "STANDBY"
-                return Status()
-            
-            @property
-            def gps_0(self):
-                class GPS:
-                    fix_type = 3  # 3D fix
-                    satellites_visible = 10
-                    eph = 100
-                    epv = 100
-                return GPS()
-            
-            @property
-            def home_location(self):
-                class Home:
-                    lat = 0.0
-                    lon = 0.0
-                return Home()
-            
-            def simple_takeoff(self, altitude):
-                """Mock simple_takeoff for compatibility."""
-                pass
-            
-            def simple_goto(self, location):
-                """Mock simple_goto for compatibility."""
-                pass
-            
-            def close(self):
-                """Mock close for compatibility."""
-                self.adapter.disconnect()
+    @staticmethod
+    def _parse(connection_string: Optional[str]) -> Tuple[str, int]:
+        """
+        Parse a connection string into a UDP host and port.
+        
+        Args:
+            connection_string: "udp:host:port", "udp://host:port", "host:port" or "webots"
             
-            def flush(self):
-                """Mock flush for compatibility."""
-                pass
+        Returns:
+            Tuple of (host, port), with 127.0.0.1:9000 filling in missing parts
+        """
+        if not connection_string or connection_string == "webots":
+            return DEFAULT_HOST, DEFAULT_PORT
+        
+        if connection_string.startswith("udp:") and not connection_string.startswith("udp://"):
+            connection_string = "udp://" + connection_string[len("udp:"):]
+        elif "://" not in connection_string:
+            connection_string = "udp://" + connection_string
+        url = urlsplit(connection_string)
         
-        self.vehicle = MockVehicle(self)
+        try:
+            port = url.port or DEFAULT_PORT
+        except ValueError:
+            logger.warning(f"Invalid port in connection string: {connection_string}, using default {DEFAULT_PORT}")
+            port = DEFAULT_PORT
+        return url.hostname or DEFAULT_HOST, port
+    
+    def _create_mock_vehicle(self):
+        """Create a mock vehicle object with minimal attributes for compatibility."""
+        self.vehicle = _MockVehicle(self)
+    
+    @property
+    def state_seq(self) -> int:
+        """Counter that advances whenever the simulated mode, armed state or altitude changes."""
+        controller = self.controller
+        state = (controller, controller.simulated_mode, controller.simulated_armed, controller.simulated_altitude)
+        if state != self._seq_state:
+            self._seq_state = state
+            self._state_seq += 1
+        return self._state_seq
+    
+    @property
+    def manoeuvre_in_progress(self) -> bool:
+        """Whether the last takeoff/land/goto command is still being flown (commands return once started)."""
+        return self.controller.manoeuvre_in_progress
+    
+    def _status(self) -> Dict:
+        """Get controller status, cached for one control update interval."""
+        now = time.monotonic()
+        if self._status_cache is None or now - self._status_ts > self.controller.update_interval:
+            self._status_cache = self.controller.get_status()
+            self._status_ts = now
+        return self._status_cache
     
     def connect_to_drone(self, connection_string: str = None, timeout: int = 10) -> bool:
         """
@@ -175,8 +261,20 @@ class WebotsDroneAdapter:
         """
         if connection_string:
             self.connection_string = connection_string
-            # Re-parse and create new controller if needed
-            self.__init__(connection_string)
+            # Only replace the controller when the target actually changed
+            address = self._parse(connection_string)
+            if address != (self.controller.host, self.controller.port):
+                if self.controller.connected:
+                    self.controller.disconnect()
+                self.controller = WebotsUDPController(host=address[0], port=address[1],
+                                                      update_rate_hz=self.controller.update_rate_hz)
+                self._status_cache = None
+        
+        if self.controller.connected:
+            # Same target and already sending: a second connect() would open
+            # another socket and start a second control loop
+            self.connected = True
+            return True
         
         logger.info(f"Connecting to Webots simulator via UDP...")
         success = self.controller.connect()
@@ -273,7 +371,7 @@ class WebotsDroneAdapter:
         if not self.connected:
             return {"error": "Not connected to Webots simulator"}
         
-        status = self.controller.get_status()
+        status = self._status()
         return {
             "latitude": status["gps"]["lat"],
             "longitude": status["gps"]["lon"],
@@ -296,6 +394,22 @@ class WebotsDroneAdapter:
             "current": 5.0
         }
     
+    def get_status_snapshot(self) -> Dict:
+        """
+        Get mode, armed state, altitude, battery and GPS position in a single read.
+        
+        Returns:
+            Dict containing mode, armed, altitude, battery level and gps lat/lon
+        """
+        status = self._status()
+        return {
+            "mode": status["mode"],
+            "armed": status["armed"],
+            "altitude": status["altitude"],
+            "battery": status["battery"],
+            "gps": status["gps"]
+        }
+    
     def get_airspeed(self) -> float:
         """Get the current airspeed."""
         return 0.0
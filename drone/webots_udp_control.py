@@ -4,17 +4,104 @@ Sends control commands via UDP to a C-based Webots drone simulator.
 Completely separate from DroneKit/MAVLink - uses only UDP.
 """
 
+import os
+import errno
 import socket
+import struct
+import sys
 import time
+import ctypes
 import threading
 import logging
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Callable, Dict, List, Literal, Optional, Tuple
 from dataclasses import dataclass
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('webots_udp')
 
+# ASCII packet parsed by the Webots controller with sscanf("%lf %lf %lf %lf")
+PACKET_FORMAT = "%.6f %.6f %.6f %.6f"
+
+# Binary alternative: four little-endian float32, recognised by its 16-byte length
+_PACK = struct.Struct('<4f').pack
+BINARY_PACKET_SIZE = 16
+
+# TOS byte for DSCP Expedited Forwarding, used for latency-critical control packets
+DSCP_EF_TOS = 0xB8
+
+# Most packets handed to a single sendmmsg call (see send_batch)
+MAX_BATCH_SIZE = 64
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_uint8 * 4),
+        ("sin_zero", ctypes.c_uint8 * 8),
+    ]
+
+
+def _raise_thread_priority():
+    """
+    Ask the OS to schedule the calling thread ahead of best-effort work.
+    
+    Tries SCHED_FIFO (Linux, needs root or CAP_SYS_NICE), then nice -5 (also
+    privileged); without privileges, or on Windows/macOS, the thread keeps its
+    normal priority.
+    """
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(10))
+        logger.info("Control loop running with SCHED_FIFO priority 10")
+        return
+    except (AttributeError, OSError):
+        pass
+    try:
+        os.nice(-5)
+        logger.info("Control loop running at nice -5")
+    except (AttributeError, OSError):
+        logger.debug("Could not raise control loop priority (needs CAP_SYS_NICE); using default scheduling")
+
+
+def _load_sendmmsg():
+    """Get libc's sendmmsg on Linux, or None where it isn't available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+
+_sendmmsg = _load_sendmmsg()
+
 
 @dataclass
 class ControlValues:
@@ -24,16 +111,71 @@ class ControlValues:
     yaw: float = 0.0
     throttle: float = 0.0
     
-    def clamp(self):
-        """Clamp values to safe ranges."""
-        self.roll = max(-2.0, min(2.0, self.roll))
-        self.pitch = max(-2.0, min(2.0, self.pitch))
-        self.yaw = max(-2.0, min(2.0, self.yaw))
-        self.throttle = max(-1.0, min(1.0, self.throttle))
-    
     def to_packet(self) -> str:
         """Convert to UDP packet format: 'roll pitch yaw throttle'"""
-        return f"{self.roll:.6f} {self.pitch:.6f} {self.yaw:.6f} {self.throttle:.6f}"
+        return PACKET_FORMAT % (self.roll, self.pitch, self.yaw, self.throttle)
+    
+    def to_binary_packet(self) -> bytes:
+        """Convert to the 16-byte binary packet format (see BINARY_PACKET_SIZE)."""
+        return _PACK(self.roll, self.pitch, self.yaw, self.throttle)
+
+
+def _segment_profile(segments: List[Tuple[float, Tuple[float, float, float, float]]]):
+    """
+    Build a piecewise-constant control profile.
+    
+    Args:
+        segments: List of (duration in seconds, (roll, pitch, yaw, throttle))
+        
+    Returns:
+        Function mapping seconds since start to control values, or None once finished
+    """
+    ends = list(accumulate(duration for duration, _ in segments))
+    
+    def profile(t: float) -> Optional[Tuple[float, float, float, float]]:
+        for end, (_, values) in zip(ends, segments):
+            if t < end:
+                return values
+        return None
+    
+    return profile
+
+
+def _encode_ascii(roll: float, pitch: float, yaw: float, throttle: float) -> bytes:
+    """Encode control values as an ASCII packet."""
+    return (PACKET_FORMAT % (roll, pitch, yaw, throttle)).encode('ascii')
+
+
+def _encode_binary(roll: float, pitch: float, yaw: float, throttle: float) -> bytes:
+    """Encode control values as a binary packet."""
+    return _PACK(roll, pitch, yaw, throttle)
+
+
+class _PacketCache:
+    """
+    Small LRU of encoded packets keyed on the exact control values.
+    
+    The control loop already skips encoding while the values object is
+    unchanged; this covers commands that re-send recent values as a new tuple
+    (repeated set_control calls, a manoeuvre repeated after a manual command).
+    Not thread-safe: used by the control loop only.
+    """
+    
+    def __init__(self, encode: Callable[[float, float, float, float], bytes], maxsize: int = 8):
+        self._encode = encode
+        self._maxsize = maxsize
+        self._packets: "OrderedDict[Tuple[float, float, float, float], bytes]" = OrderedDict()
+    
+    def __call__(self, values: Tuple[float, float, float, float]) -> bytes:
+        packets = self._packets
+        packet = packets.get(values)
+        if packet is None:
+            packet = packets[values] = self._encode(*values)
+            if len(packets) > self._maxsize:
+                packets.popitem(last=False)
+        else:
+            packets.move_to_end(values)
+        return packet
 
 
 class WebotsUDPController:
@@ -45,7 +187,10 @@ class WebotsUDPController:
     def __init__(self, 
                  host: str = "127.0.0.1", 
                  port: int = 9000,
-                 update_rate_hz: float = 30.0):
+                 update_rate_hz: float = 30.0,
+                 sndbuf_bytes: int = 4 * 1024 * 1024,
+                 rcvbuf_bytes: int = 4 * 1024 * 1024,
+                 wire_format: Literal['ascii', 'binary'] = 'ascii'):
         """
         Initialize the Webots UDP controller.
         
@@ -53,18 +198,60 @@ class WebotsUDPController:
             host: UDP destination host (default: 127.0.0.1)
             port: UDP destination port (default: 9000)
             update_rate_hz: Control update rate in Hz (default: 30 Hz, range: 20-50)
+            sndbuf_bytes: Requested socket send buffer size (default: 4 MiB)
+            rcvbuf_bytes: Requested socket receive buffer size (default: 4 MiB)
+            wire_format: 'ascii' text packets, or 'binary' float32 packets (cheaper to
+                         build; needs the updated Webots controller in webots_file/)
         """
         self.host = host
         self.port = port
         self.update_rate_hz = max(20.0, min(50.0, update_rate_hz))  # Clamp between 20-50 Hz
         self.update_interval = 1.0 / self.update_rate_hz
-        
-        # Control state
-        self.control_values = ControlValues()
-        self._lock = threading.Lock()
-        
-        # UDP socket
+        self.sndbuf_bytes = sndbuf_bytes
+        self.rcvbuf_bytes = rcvbuf_bytes
+        
+        # Control state: (roll, pitch, yaw, throttle). Replaced as a whole tuple, which
+        # is atomic, so the control loop can read it without taking a lock
+        self._control_tuple: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+        
+        # Encoded packet for the current control values, re-encoded (through a small
+        # LRU of recent packets) only when set_control changes them. Written by the
+        # control loop thread only.
+        if wire_format == 'binary':
+            self._encode = _PacketCache(_encode_binary)
+        elif wire_format == 'ascii':
+            self._encode = _PacketCache(_encode_ascii)
+        else:
+            raise ValueError(f"Unknown wire format: {wire_format}")
+        self.wire_format = wire_format
+        self._sent_tuple = self._control_tuple
+        self._packet = self._encode(self._sent_tuple)
+        
+        # Reusable sendmmsg arrays for send_batch
+        self._batch_lock = threading.Lock()
+        self._batch_msgs = (_MMsgHdr * MAX_BATCH_SIZE)()
+        self._batch_iovs = (_IOVec * MAX_BATCH_SIZE)()
+        self._batch_addrs = (_SockAddrIn * MAX_BATCH_SIZE)()
+        self._sockaddr_cache: Dict[Tuple[str, int], _SockAddrIn] = {}
+        for i in range(MAX_BATCH_SIZE):
+            hdr = self._batch_msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._batch_addrs[i])
+            hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+            hdr.msg_iov = ctypes.pointer(self._batch_iovs[i])
+            hdr.msg_iovlen = 1
+        
+        # UDP socket, plus the destination and bound sendto cached for the hot path
         self.socket: Optional[socket.socket] = None
+        self._addr: Optional[Tuple[str, int]] = None
+        self._sendto = None
+        
+        # Timed manoeuvre (takeoff/land/climb) advanced by the control loop itself:
+        # (profile function, start time, completion callback) or None. The callback
+        # gets the seconds the manoeuvre actually ran, so an interrupted one can
+        # record partial progress. The lock keeps a profile step from overwriting
+        # a manual command set mid-step.
+        self._profile: Optional[Tuple[Callable[[float], Optional[Tuple[float, float, float, float]]], float, Callable[[float], None]]] = None
+        self._profile_lock = threading.RLock()
         
         # Control loop state
         self.running = False
@@ -74,7 +261,10 @@ class WebotsUDPController:
         # Statistics
         self.packets_sent = 0
         self.packets_failed = 0
-        self.last_send_time = 0.0
+        self.last_send_time = 0.0  # time.monotonic() of the last send
+        self._last_send_error: Optional[Exception] = None
+        self._stats_sent = 0
+        self._stats_failed = 0
         
         # Simulated drone state (for status queries)
         self.simulated_altitude = 0.0
@@ -89,22 +279,41 @@ class WebotsUDPController:
             bool: True if connection successful
         """
         try:
-            logger.info(f"Initializing UDP controller for {self.host}:{self.port}")
+            logger.info("Initializing UDP controller for %s:%s", self.host, self.port)
             
             # Create non-blocking UDP socket
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.socket.setblocking(False)
+            self._sendto = self.socket.sendto
             
-            # Set socket options
-            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+            # Resolve the destination once, instead of letting every sendto look it up;
+            # this also surfaces bad hostnames without sending a test packet (the control
+            # loop's first tick sends the initial packet)
+            try:
+                self._addr = (socket.gethostbyname(self.host), self.port)
+            except OSError as e:
+                logger.warning("⚠️  Could not resolve %s: %s", self.host, e)
+                self._addr = (self.host, self.port)
+            
+            # Set socket options. Large buffers absorb scheduling stalls of the control
+            # thread; Linux caps them at net.core.wmem_max / rmem_max, so raise those
+            # (e.g. sysctl -w net.core.wmem_max=12582912) if the sizes below get clipped
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf_bytes)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf_bytes)
             
-            # Test send initial packet
-            test_packet = self.control_values.to_packet()
+            # Mark control traffic DSCP EF (46 << 2) so queueing disciplines send it
+            # ahead of best-effort traffic
             try:
-                self.socket.sendto(test_packet.encode('ascii'), (self.host, self.port))
-                logger.info(f"✅ Test packet sent successfully to {self.host}:{self.port}")
-            except Exception as e:
-                logger.warning(f"⚠️  Test packet failed (this is OK if Webots not running): {e}")
+                self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, DSCP_EF_TOS)
+            except (OSError, AttributeError) as e:
+                logger.debug("Could not set IP_TOS: %s", e)
+            
+            logger.debug(
+                "Socket buffers: SO_SNDBUF=%d, SO_RCVBUF=%d",
+                self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF),
+                self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            )
             
             # Start control loop
             self.running = True
@@ -112,11 +321,11 @@ class WebotsUDPController:
             self.control_thread.start()
             
             self.connected = True
-            logger.info(f"✅ UDP controller started at {self.update_rate_hz} Hz")
+            logger.info("✅ UDP controller started at %s Hz", self.update_rate_hz)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Failed to initialize UDP controller: {e}")
+            logger.error("❌ Failed to initialize UDP controller: %s", e)
             self.connected = False
             return False
     
@@ -129,16 +338,21 @@ class WebotsUDPController:
         if self.control_thread and self.control_thread.is_alive():
             self.control_thread.join(timeout=2.0)
         
+        # A manoeuvre cut short by the disconnect ends where it got to
+        self._finish_profile()
+        
         # Close socket
         if self.socket:
             try:
                 self.socket.close()
             except Exception as e:
-                logger.warning(f"Error closing socket: {e}")
+                logger.warning("Error closing socket: %s", e)
             self.socket = None
+        self._sendto = None
+        self._addr = None
         
         self.connected = False
-        logger.info(f"✅ Disconnected. Stats: {self.packets_sent} sent, {self.packets_failed} failed")
+        logger.info("✅ Disconnected. Stats: %d sent, %d failed", self.packets_sent, self.packets_failed)
     
     def set_control(self, roll: float = 0.0, pitch: float = 0.0, 
                     yaw: float = 0.0, throttle: float = 0.0):
@@ -152,20 +366,27 @@ class WebotsUDPController:
             yaw: Yaw rate command [-2.0, 2.0]
             throttle: Throttle command [-1.0, 1.0]
         """
-        with self._lock:
-            self.control_values.roll = roll
-            self.control_values.pitch = pitch
-            self.control_values.yaw = yaw
-            self.control_values.throttle = throttle
-            self.control_values.clamp()
+        # Clamp inline; set_control is called for every command
+        values = (
+            -2.0 if roll < -2.0 else (2.0 if roll > 2.0 else roll),
+            -2.0 if pitch < -2.0 else (2.0 if pitch > 2.0 else pitch),
+            -2.0 if yaw < -2.0 else (2.0 if yaw > 2.0 else yaw),
+            -1.0 if throttle < -1.0 else (1.0 if throttle > 1.0 else throttle),
+        )
+        with self._profile_lock:
+            # Manual control overrides any manoeuvre in progress; finish it first
+            # so the simulated state reflects how far it got
+            self._finish_profile()
+            self._control_tuple = values
     
     def get_control(self) -> Tuple[float, float, float, float]:
         """Get current control values (thread-safe)."""
-        with self._lock:
-            return (self.control_values.roll, 
-                   self.control_values.pitch,
-                   self.control_values.yaw,
-                   self.control_values.throttle)
+        return self._control_tuple
+    
+    @property
+    def manoeuvre_in_progress(self) -> bool:
+        """Whether a takeoff, landing or climb started by a command is still running."""
+        return self._profile is not None
     
     def _control_loop(self):
         """
@@ -173,61 +394,182 @@ class WebotsUDPController:
         Sends UDP packets at the configured rate.
         """
         logger.info("Control loop started")
+        _raise_thread_priority()
+        
+        # Sleep towards absolute deadlines so sleep overshoot doesn't accumulate
+        # into drift; monotonic time is immune to wall-clock adjustments
+        monotonic = time.monotonic
+        sleep = time.sleep
+        deadline = monotonic()
+        stats_time = deadline
         
         while self.running:
-            loop_start = time.time()
-            
             try:
-                # Get current control values
-                with self._lock:
-                    packet = self.control_values.to_packet()
+                # Advance the current manoeuvre, if any
+                if self._profile is not None:
+                    with self._profile_lock:
+                        active = self._profile
+                        if active is not None:
+                            profile, started, on_done = active
+                            elapsed = monotonic() - started
+                            values = profile(elapsed)
+                            if values is not None:
+                                self._control_tuple = values
+                            else:
+                                self._profile = None
+                                on_done(elapsed)
+                
+                # Re-encode the packet only if the control values changed
+                values = self._control_tuple
+                if values is not self._sent_tuple:
+                    self._packet = self._encode(values)
+                    self._sent_tuple = values
                 
                 # Send UDP packet
-                self._send_packet(packet)
+                self._send_packet(self._packet)
                 
                 # Update last send time
-                self.last_send_time = time.time()
+                now = monotonic()
+                self.last_send_time = now
+                
+                # Report statistics once per second rather than per packet
+                if now - stats_time >= 1.0:
+                    self._log_stats(now - stats_time)
+                    stats_time = now
                 
-                # Sleep to maintain update rate
-                elapsed = time.time() - loop_start
-                sleep_time = self.update_interval - elapsed
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                elif sleep_time < -0.01:  # More than 10ms behind
-                    logger.warning(f"Control loop running slow: {elapsed*1000:.1f}ms (target: {self.update_interval*1000:.1f}ms)")
+                # Sleep until the next tick to maintain update rate
+                deadline += self.update_interval
+                if deadline < now - 0.05:
+                    # Stalled for several ticks - resync instead of bursting to catch up
+                    logger.warning("Control loop running slow: %.1fms behind (target: %.1fms)",
+                                   (now - deadline) * 1000, self.update_interval * 1000)
+                    deadline = now
+                else:
+                    sleep(max(0.0, deadline - now))
                     
             except Exception as e:
-                logger.error(f"Error in control loop: {e}")
+                logger.error("Error in control loop: %s", e)
                 time.sleep(0.1)  # Prevent tight loop on error
+                deadline = time.monotonic()
         
         logger.info("Control loop stopped")
     
-    def _send_packet(self, packet: str):
+    def _send_packet(self, packet: bytes):
         """
         Send a UDP packet (non-blocking).
         
         Args:
-            packet: ASCII string to send
+            packet: Encoded packet to send
         """
-        if not self.socket:
+        sendto = self._sendto
+        if sendto is None:
             self.packets_failed += 1
             return
         
         try:
-            self.socket.sendto(packet.encode('ascii'), (self.host, self.port))
+            sendto(packet, self._addr)
             self.packets_sent += 1
-            
-            # Log periodically (every 100 packets)
-            if self.packets_sent % 100 == 0:
-                logger.debug(f"📡 Sent {self.packets_sent} packets (rate: {self.update_rate_hz} Hz)")
-                
         except BlockingIOError:
             # Socket buffer full - this is OK for non-blocking socket
             pass
         except Exception as e:
+            # Reported by _log_stats
             self.packets_failed += 1
-            if self.packets_failed % 50 == 0:  # Log every 50 failures
-                logger.warning(f"⚠️  Packet send failed (total: {self.packets_failed}): {e}")
+            self._last_send_error = e
+    
+    def _log_stats(self, elapsed: float):
+        """
+        Log send statistics since the previous call (called about once per second).
+        
+        Args:
+            elapsed: Seconds since the previous call
+        """
+        sent = self.packets_sent - self._stats_sent
+        failed = self.packets_failed - self._stats_failed
+        self._stats_sent = self.packets_sent
+        self._stats_failed = self.packets_failed
+        
+        if failed:
+            logger.warning("⚠️  %d packet sends failed in the last %.1fs (total: %d): %s",
+                           failed, elapsed, self.packets_failed, self._last_send_error)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📡 Sent %d packets (%.1f packets/s, total: %d)", sent, sent / elapsed, self.packets_sent)
+    
+    def send_batch(self, packets: List[Tuple[bytes, Tuple[str, int]]]) -> int:
+        """
+        Send several packets, e.g. control packets for a swarm of drones.
+        
+        On Linux the packets go out in one sendmmsg() syscall per MAX_BATCH_SIZE
+        packets; elsewhere (or for non-IPv4 destinations) they are sent one by one.
+        
+        Args:
+            packets: List of (payload, (host, port)) tuples
+            
+        Returns:
+            int: Number of packets sent
+        """
+        if not self.socket:
+            self.packets_failed += len(packets)
+            return 0
+        
+        sent = 0
+        for start in range(0, len(packets), MAX_BATCH_SIZE):
+            chunk = packets[start:start + MAX_BATCH_SIZE]
+            count = self._send_chunk(chunk)
+            sent += count
+            if count < len(chunk):
+                break
+        self.packets_sent += sent
+        return sent
+    
+    def _send_chunk(self, packets: List[Tuple[bytes, Tuple[str, int]]]) -> int:
+        """Send up to MAX_BATCH_SIZE packets, returning how many were sent."""
+        if _sendmmsg is not None:
+            try:
+                addrs = [self._sockaddr(addr) for _, addr in packets]
+            except (OSError, ValueError):
+                addrs = None
+            if addrs is not None:
+                with self._batch_lock:
+                    # Keep the payload buffers alive until the syscall returns
+                    buffers = [ctypes.create_string_buffer(bytes(payload), len(payload)) for payload, _ in packets]
+                    for i, (buf, addr) in enumerate(zip(buffers, addrs)):
+                        self._batch_iovs[i].iov_base = ctypes.addressof(buf)
+                        self._batch_iovs[i].iov_len = len(buf)
+                        self._batch_addrs[i] = addr
+                    count = _sendmmsg(self.socket.fileno(), self._batch_msgs, len(packets), 0)
+                if count >= 0:
+                    return count
+                err = ctypes.get_errno()
+                if err not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    # Buffer full is dropped silently, like in _send_packet
+                    self.packets_failed += len(packets)
+                    logger.warning("⚠️  sendmmsg failed: %s", os.strerror(err))
+                return 0
+        
+        sent = 0
+        for payload, addr in packets:
+            try:
+                self.socket.sendto(payload, addr)
+                sent += 1
+            except BlockingIOError:
+                break
+            except Exception as e:
+                self.packets_failed += 1
+                logger.warning("⚠️  Packet send failed: %s", e)
+        return sent
+    
+    def _sockaddr(self, addr: Tuple[str, int]) -> _SockAddrIn:
+        """Build (and cache) the sockaddr_in for an IPv4 (host, port) destination."""
+        sockaddr = self._sockaddr_cache.get(addr)
+        if sockaddr is None:
+            host, port = addr
+            sockaddr = _SockAddrIn()
+            sockaddr.sin_family = socket.AF_INET
+            sockaddr.sin_port = socket.htons(port)
+            sockaddr.sin_addr[:] = socket.inet_aton(socket.gethostbyname(host))
+            self._sockaddr_cache[addr] = sockaddr
+        return sockaddr
     
     def get_stats(self) -> Dict:
         """Get controller statistics."""
@@ -237,16 +579,47 @@ class WebotsUDPController:
             "update_rate_hz": self.update_rate_hz,
             "packets_sent": self.packets_sent,
             "packets_failed": self.packets_failed,
-            "time_since_last_send": time.time() - self.last_send_time if self.last_send_time > 0 else None,
+            "time_since_last_send": time.monotonic() - self.last_send_time if self.last_send_time > 0 else None,
             "current_control": self.get_control()
         }
     
+    def _start_profile(self, segments: List[Tuple[float, Tuple[float, float, float, float]]],
+                       on_done: Callable[[float], None]):
+        """
+        Run a timed sequence of control values from the control loop.
+        
+        Returns immediately; the control loop applies each segment in turn, aligned
+        to its own send clock, and calls on_done (on the loop thread) at the end.
+        
+        Args:
+            segments: List of (duration in seconds, (roll, pitch, yaw, throttle))
+            on_done: Callback run with the seconds elapsed once the last segment
+                has elapsed or the manoeuvre is interrupted
+        """
+        with self._profile_lock:
+            self._finish_profile()
+            self._profile = (_segment_profile(segments), time.monotonic(), on_done)
+    
+    def _finish_profile(self):
+        """
+        End a running manoeuvre early, running its completion callback with the
+        time it actually ran so the simulated state (altitude, armed) reflects
+        the progress made before it was replaced.
+        """
+        with self._profile_lock:
+            active = self._profile
+            if active is not None:
+                self._profile = None
+                _, started, on_done = active
+                on_done(time.monotonic() - started)
+    
     # High-level control commands for compatibility with existing code
     
     def arm_and_takeoff(self, target_altitude: float) -> bool:
         """
         Simplified takeoff for Webots.
         Gradually increases throttle to achieve takeoff, then stops at target.
+        The climb runs in the control loop; the call returns immediately.
         
         Args:
             target_altitude: Target altitude in meters
@@ -258,31 +631,37 @@ class WebotsUDPController:
             logger.error("Cannot takeoff: not connected")
             return False
         
-        logger.info(f"🚁 Taking off to {target_altitude}m...")
+        logger.info("🚁 Taking off to %sm...", target_altitude)
+        self._finish_profile()
         self.simulated_mode = "GUIDED"
         self.simulated_armed = True
         
-        # Ramp up throttle smoothly
-        for throttle in [0.2, 0.4, 0.6, 0.7]:
-            self.set_control(throttle=throttle)
-            time.sleep(0.5)
-        
-        # Climb at 0.6 m/s for calculated time
+        # Ramp up throttle smoothly, then climb at 0.6 m/s for calculated time
         climb_speed = 0.6  # m/s
         climb_time = target_altitude / climb_speed
-        self.set_control(throttle=climb_speed)
-        time.sleep(climb_time)
-        
-        # Stop climbing - set throttle to 0 (maintain altitude)
-        self.set_control(throttle=0.0)
-        self.simulated_altitude = target_altitude
-        
-        logger.info(f"✅ Takeoff complete - now hovering at {target_altitude}m (throttle=0)")
+        ramp_time = 2.0
+        segments = [(ramp_time / 4, (0.0, 0.0, 0.0, throttle)) for throttle in (0.2, 0.4, 0.6, 0.7)]
+        segments.append((climb_time, (0.0, 0.0, 0.0, climb_speed)))
+        
+        def on_done(elapsed: float):
+            # Stop climbing - set throttle to 0 (maintain altitude). Altitude is
+            # estimated from the climb time, treating the ramp-up as ground time.
+            self._control_tuple = (0.0, 0.0, 0.0, 0.0)
+            climbed = max(0.0, elapsed - ramp_time) * climb_speed
+            if climbed >= target_altitude:
+                self.simulated_altitude = target_altitude
+                logger.info("✅ Takeoff complete - now hovering at %sm (throttle=0)", target_altitude)
+            else:
+                self.simulated_altitude = climbed
+                logger.info("Takeoff interrupted at ~%.1fm", climbed)
+        
+        self._start_profile(segments, on_done)
         return True
     
     def land(self) -> bool:
         """
         Land the drone by gradually reducing throttle.
+        The descent runs in the control loop; the call returns immediately.
         
         Returns:
             bool: True if command accepted
@@ -292,26 +671,34 @@ class WebotsUDPController:
             return False
         
         logger.info("🛬 Landing...")
+        self._finish_profile()
         self.simulated_mode = "LAND"
         
         # Gradually descend
         # Use negative throttle to descend at controlled rate
         descent_speed = -0.3  # Descend at 0.3 m/s
-        descent_time = max(self.simulated_altitude / 0.3, 5.0)  # At least 5 seconds
-        
-        self.set_control(throttle=descent_speed)
-        time.sleep(descent_time)
-        
-        # Final descent
-        self.set_control(throttle=-0.1)
-        time.sleep(2)
-        
-        # Stop all movement
-        self.set_control(roll=0.0, pitch=0.0, yaw=0.0, throttle=0.0)
-        self.simulated_altitude = 0.0
-        self.simulated_armed = False
-        
-        logger.info("✅ Landing complete")
+        start_altitude = self.simulated_altitude
+        descent_time = max(start_altitude / 0.3, 5.0)  # At least 5 seconds
+        
+        segments = [
+            (descent_time, (0.0, 0.0, 0.0, descent_speed)),
+            (2.0, (0.0, 0.0, 0.0, -0.1)),  # Final descent
+        ]
+        total_time = descent_time + 2.0
+        
+        def on_done(elapsed: float):
+            # Stop all movement
+            self._control_tuple = (0.0, 0.0, 0.0, 0.0)
+            if elapsed >= total_time:
+                self.simulated_altitude = 0.0
+                self.simulated_armed = False
+                logger.info("✅ Landing complete")
+            else:
+                # Interrupted: still armed, at the height reached so far
+                self.simulated_altitude = max(0.0, start_altitude + elapsed * descent_speed)
+                logger.info("Landing interrupted at ~%.1fm", self.simulated_altitude)
+        
+        self._start_profile(segments, on_done)
         return True
     
     def goto_location(self, latitude: float, longitude: float, altitude: float) -> bool:
@@ -331,18 +718,25 @@ class WebotsUDPController:
             logger.error("Cannot navigate: not connected")
             return False
         
-        logger.info(f"🧭 Going to: lat={latitude:.6f}, lon={longitude:.6f}, alt={altitude}m")
+        logger.info("🧭 Going to: lat=%.6f, lon=%.6f, alt=%sm", latitude, longitude, altitude)
         logger.warning("⚠️  GPS navigation requires implementation in Webots controller")
         
         # Adjust altitude if different
+        self._finish_profile()
         altitude_diff = altitude - self.simulated_altitude
         if abs(altitude_diff) > 0.5:
             throttle = 0.5 if altitude_diff > 0 else -0.3
             climb_time = abs(altitude_diff) / abs(throttle)
-            self.set_control(throttle=throttle)
-            time.sleep(climb_time)
-            self.set_control(throttle=0.0)
-            self.simulated_altitude = altitude
+            start_altitude = self.simulated_altitude
+            
+            def on_done(elapsed: float):
+                self._control_tuple = (0.0, 0.0, 0.0, 0.0)
+                if elapsed >= climb_time:
+                    self.simulated_altitude = altitude
+                else:
+                    self.simulated_altitude = start_altitude + elapsed * throttle
+            
+            self._start_profile([(climb_time, (0.0, 0.0, 0.0, throttle))], on_done)
         
         return True
     
@@ -375,6 +769,7 @@ class WebotsUDPController:
     
     def get_status(self) -> Dict:
         """Get simulated drone status."""
+        roll, pitch, yaw, throttle = self._control_tuple
         return {
             "connected": self.connected,
             "mode": self.simulated_mode,
@@ -386,10 +781,10 @@ class WebotsUDPController:
                 "lon": 0.0   # Simulated
             },
             "control": {
-                "roll": self.control_values.roll,
-                "pitch": self.control_values.pitch,
-                "yaw": self.control_values.yaw,
-                "throttle": self.control_values.throttle
+                "roll": roll,
+                "pitch": pitch,
+                "yaw": yaw,
+                "throttle": throttle
             }
         }
 
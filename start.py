@@ -5,8 +5,11 @@ DeepDrone Launcher - Starts simulator and web interface together
 
 import sys
 import os
+import argparse
 import subprocess
+import multiprocessing
 import time
+import socket
 import signal
 import webbrowser
 import threading
@@ -16,48 +19,215 @@ from pathlib import Path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
-class DeepDroneLauncher:
+# Modules the forkserver imports once, so each simulator start skips them
+SIMULATOR_PRELOAD = ["simple_simulator"]
+
+SIMULATOR_ADDRESS = ("127.0.0.1", 5760)
+# SITL is verbose; its output goes here rather than into the web server's console
+SIMULATOR_LOG = current_dir / "simulator.log"
+# "PID start-time" of the running simulator. Forkserver children don't have
+# simple_simulator.py on their command line, so this is how a later run finds one
+# left by a crash; the start time tells it apart from a process reusing the PID.
+SIMULATOR_PIDFILE = current_dir / "simulator.pid"
+
+def _run_simulator():
+    """Simulator process entry point."""
+    # Point stdout/stderr (including SITL's own child processes) at the log file
+    log_fd = os.open(SIMULATOR_LOG, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    os.dup2(log_fd, 1)
+    os.dup2(log_fd, 2)
+    os.close(log_fd)
+    sys.stdout.reconfigure(line_buffering=True)
+
+    # Process.terminate() sends SIGTERM; route it through the simulator's
+    # KeyboardInterrupt handler so SITL is stopped cleanly
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    import simple_simulator
+    simple_simulator.main()
+
+def _wait_until(probe, timeout: float, interval: float = 0.05) -> bool:
+    """
+    Poll a readiness probe until it succeeds or the timeout elapses.
+    
+    Args:
+        probe: Callable returning True once the service is ready
+        timeout: Maximum time to wait in seconds
+        interval: Delay between attempts in seconds
+        
+    Returns:
+        bool: True if the probe succeeded in time
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if probe():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+def _port_open(address) -> bool:
+    """Check whether a TCP listener accepts connections at address."""
+    try:
+        with socket.create_connection(address, timeout=0.05):
+            return True
+    except OSError:
+        return False
+
+def _process_start_time(pid: int):
+    """Start time of a process in clock ticks since boot (from /proc), or None if unavailable."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # The command name (field 2) may contain spaces; starttime is field 22
+    return stat[stat.rindex(")") + 2:].split()[19]
+
+def _kill_stale_simulator():
+    """Stop the simulator recorded in SIMULATOR_PIDFILE by an earlier run, if still running."""
+    try:
+        pid_text, start_time = SIMULATOR_PIDFILE.read_text().split()
+        pid = int(pid_text)
+    except (OSError, ValueError):
+        return
+    SIMULATOR_PIDFILE.unlink(missing_ok=True)
+
+    # Only signal the exact process that was recorded: a reused PID has a
+    # different start time. Without /proc this can't be checked, and the
+    # port 5760 cleanup still catches a stale simulator.
+    def still_ours() -> bool:
+        return _process_start_time(pid) == start_time
+
+    if not still_ours():
+        return
+    try:
+        # SIGTERM lets the simulator stop SITL cleanly (see _run_simulator)
+        os.kill(pid, signal.SIGTERM)
+        if not _wait_until(lambda: not still_ours(), timeout=3):
+            os.kill(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _simulator_context():
+    """Multiprocessing context for the simulator (forkserver where available)."""
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(SIMULATOR_PRELOAD)
+    return ctx
+
+class _ExternalSimulator:
+    """A simple_simulator.py subprocess behind the multiprocessing.Process calls the launcher uses."""
+
     def __init__(self):
+        with open(SIMULATOR_LOG, "ab") as log:
+            self.popen = subprocess.Popen([sys.executable, 'simple_simulator.py'], cwd=current_dir,
+                                          stdout=log, stderr=subprocess.STDOUT)
+
+    @property
+    def pid(self):
+        return self.popen.pid
+
+    @property
+    def exitcode(self):
+        return self.popen.poll()
+
+    def is_alive(self) -> bool:
+        return self.popen.poll() is None
+
+    def join(self, timeout=None):
+        try:
+            self.popen.wait(timeout)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def terminate(self):
+        self.popen.terminate()
+
+    def kill(self):
+        self.popen.kill()
+
+class DeepDroneLauncher:
+    def __init__(self, shutdown_timeout: float = 15.0, external_sim: bool = False):
         self.simulator_process = None
-        self.web_server_process = None
+        # Run simple_simulator.py as a separate interpreter instead of a forkserver child
+        self.external_sim = external_sim
+        self.server = None
+        self.server_thread = None
+
+        # Graceful shutdown budget shared by the web server drain and the simulator
+        self.shutdown_timeout = shutdown_timeout
+        self._shutdown_event = threading.Event()
+        self._shutdown_deadline = None
+
+    def _begin_shutdown(self):
+        """Start the shutdown clock (once) and wake the main thread."""
+        if self._shutdown_deadline is None:
+            self._shutdown_deadline = time.monotonic() + self.shutdown_timeout
+        self._shutdown_event.set()
+
+    def _remaining(self) -> float:
+        """Seconds left of the graceful shutdown budget."""
+        self._begin_shutdown()
+        return max(0.0, self._shutdown_deadline - time.monotonic())
 
     def open_browser(self):
-        """Open browser after a short delay."""
-        time.sleep(2)  # Wait for server to start
+        """Open the web interface in the default browser."""
         webbrowser.open('http://localhost:8000')
 
     def start_simulator(self):
         """Start the drone simulator in the background."""
         print("🚁 Starting drone simulator...")
         try:
-            self.simulator_process = subprocess.Popen(
-                [sys.executable, 'simple_simulator.py'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                cwd=current_dir,
-                bufsize=1,
-                universal_newlines=True
+            if self.external_sim:
+                self.simulator_process = _ExternalSimulator()
+            else:
+                ctx = _simulator_context()
+                self.simulator_process = ctx.Process(target=_run_simulator, name="simulator", daemon=False)
+                self.simulator_process.start()
+            pid = self.simulator_process.pid
+            SIMULATOR_PIDFILE.write_text(f"{pid} {_process_start_time(pid)}")
+            print("✓ Simulator started (PID: {}, log: {})".format(self.simulator_process.pid, SIMULATOR_LOG.name))
+
+            # Continue as soon as SITL accepts MAVLink connections (or the child died)
+            ready = _wait_until(
+                lambda: _port_open(SIMULATOR_ADDRESS) or not self.simulator_process.is_alive(),
+                timeout=5
             )
-            print("✓ Simulator started (PID: {})".format(self.simulator_process.pid))
-            time.sleep(2)  # Give simulator time to initialize
+            if not self.simulator_process.is_alive():
+                print(f"✗ Simulator exited (code {self.simulator_process.exitcode})")
+                return False
+            if not ready:
+                print("⚠ Simulator still initializing, continuing startup")
             return True
         except Exception as e:
             print(f"✗ Failed to start simulator: {e}")
             return False
 
     def start_web_server(self):
-        """Start the web server."""
+        """Start the web server and block until shutdown is requested."""
         print("🌐 Starting web server...")
         try:
             import uvicorn
-            from web_server import app
+            from web_server import app, UVICORN_OPTIONS
 
-            # Open browser in a separate thread
-            browser_thread = threading.Thread(target=self.open_browser, daemon=True)
-            browser_thread.start()
+            # Serve from a worker thread so uvicorn leaves signal handling to
+            # the launcher, which decides when to drain and when to force exit
+            config = uvicorn.Config(app, host="0.0.0.0", port=8000, log_level="info", **UVICORN_OPTIONS)
+            self.server = uvicorn.Server(config)
+            self.server_thread = threading.Thread(target=self.server.run, name="web-server")
+            self.server_thread.start()
 
-            # Start the server (this blocks)
-            uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+            # Open the browser as soon as uvicorn reports its sockets are listening
+            while self.server_thread.is_alive() and not self.server.started:
+                if self._shutdown_event.wait(0.05):
+                    break
+            if self.server.started and not self._shutdown_event.is_set():
+                self.open_browser()
+
+            # Block until a shutdown signal arrives or the server stops on its own
+            while self.server_thread.is_alive() and not self._shutdown_event.wait(0.5):
+                pass
+            return True
 
         except Exception as e:
             print(f"✗ Failed to start web server: {e}")
@@ -65,21 +235,41 @@ class DeepDroneLauncher:
             traceback.print_exc()
             return False
 
+    def stop_web_server(self):
+        """Let uvicorn drain connections, forcing exit once the budget runs out."""
+        if not self.server:
+            return
+
+        self.server.should_exit = True
+        self.server_thread.join(self._remaining())
+        if self.server_thread.is_alive():
+            print("   ⚠ Web server still draining, forcing exit...")
+            self.server.force_exit = True
+            self.server_thread.join(5)
+        self.server = None
+        print("   ✓ Web server stopped")
+
     def cleanup(self):
         """Clean up processes on exit."""
+        if self.server is None and self.simulator_process is None:
+            return
         print("\n\n🛑 Shutting down...")
 
+        self.stop_web_server()
+
         if self.simulator_process:
             print("   Stopping simulator...")
             self.simulator_process.terminate()
-            try:
-                self.simulator_process.wait(timeout=5)
-                print("   ✓ Simulator stopped")
-            except subprocess.TimeoutExpired:
+            self.simulator_process.join(self._remaining())
+            if self.simulator_process.is_alive():
                 print("   ⚠ Force killing simulator...")
                 self.simulator_process.kill()
+                self.simulator_process.join()
+            else:
+                print("   ✓ Simulator stopped")
+            self.simulator_process = None
+            SIMULATOR_PIDFILE.unlink(missing_ok=True)
 
-        print("   ✓ Web server stopped")
         print("\n👋 DeepDrone shutdown complete. Goodbye!\n")
 
     def cleanup_ports(self):
@@ -90,7 +280,8 @@ class DeepDroneLauncher:
             subprocess.run("lsof -ti:8000 | xargs kill -9 2>/dev/null || true", shell=True)
             # Kill processes on port 5760
             subprocess.run("lsof -ti:5760 | xargs kill -9 2>/dev/null || true", shell=True)
-            # Kill any old simulator processes
+            # Kill any old simulator processes (pidfile covers forkserver-started ones)
+            _kill_stale_simulator()
             subprocess.run("pkill -f simple_simulator.py 2>/dev/null || true", shell=True)
             time.sleep(1)
             print("✓ Ports cleaned")
@@ -103,8 +294,19 @@ class DeepDroneLauncher:
         """Main launcher."""
         # Set up signal handler for graceful shutdown
         def signal_handler(sig, frame):
-            self.cleanup()
-            sys.exit(0)
+            if self._shutdown_event.is_set():
+                # Second signal: the user (or orchestrator) is out of patience
+                print("\n⚠ Forced exit")
+                if self.simulator_process and self.simulator_process.is_alive():
+                    self.simulator_process.kill()
+                os._exit(1)
+
+            print(f"\n🛑 Shutdown requested (up to {self.shutdown_timeout:g}s, signal again to force)")
+            self._begin_shutdown()
+            if self.server is None:
+                # Still starting up; nothing to drain
+                self.cleanup()
+                sys.exit(0)
 
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
@@ -156,7 +358,14 @@ class DeepDroneLauncher:
             self.cleanup()
 
 def main():
-    launcher = DeepDroneLauncher()
+    parser = argparse.ArgumentParser(description="Start the DeepDrone simulator and web interface")
+    parser.add_argument("--shutdown-timeout", type=float, default=15.0,
+                        help="Seconds to wait for connections and the simulator to stop before killing them")
+    parser.add_argument("--external-sim", action="store_true",
+                        help="Run simple_simulator.py as a separate interpreter (easier to debug)")
+    args = parser.parse_args()
+
+    launcher = DeepDroneLauncher(shutdown_timeout=args.shutdown_timeout, external_sim=args.external_sim)
     launcher.run()
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ class DeepDrone {
         this.isAIConfigured = false;
         this.isDroneConnected = false;
         this.telemetryInterval = null;
+        this.streamingMessage = null;
 
         this.init();
     }
@@ -485,6 +486,28 @@ class DeepDrone {
         this.scrollToBottom();
     }
 
+    appendStreamChunk(text) {
+        if (!this.streamingMessage) {
+            this.removeTypingIndicator();
+            const messageDiv = document.createElement('div');
+            messageDiv.className = 'message assistant';
+            const contentDiv = document.createElement('div');
+            contentDiv.className = 'message-content';
+            messageDiv.appendChild(contentDiv);
+            this.messages.appendChild(messageDiv);
+            this.streamingMessage = messageDiv;
+        }
+        this.streamingMessage.querySelector('.message-content').textContent += text;
+        this.scrollToBottom();
+    }
+
+    clearStreamingMessage() {
+        if (this.streamingMessage) {
+            this.streamingMessage.remove();
+            this.streamingMessage = null;
+        }
+    }
+
     addTypingIndicator() {
         const indicator = document.createElement('div');
         indicator.className = 'message assistant typing-indicator';
@@ -521,23 +544,36 @@ class DeepDrone {
         const wsUrl = `${protocol}//${window.location.host}/ws/chat`;
 
         this.ws = new WebSocket(wsUrl);
+        // The server sends JSON as binary frames when orjson is installed
+        this.ws.binaryType = 'arraybuffer';
+        const decoder = new TextDecoder();
 
         this.ws.onopen = () => {
             console.log('✅ WebSocket connected');
         };
 
         this.ws.onmessage = (event) => {
-            console.log('📨 Received message:', event.data);
-            const data = JSON.parse(event.data);
-
-            if (data.type === 'ai_message') {
-                // Remove typing indicator
+            const text = typeof event.data === 'string' ? event.data : decoder.decode(event.data);
+            console.log('📨 Received message:', text);
+            const data = JSON.parse(text);
+
+            if (data.type === 'ai_chunk') {
+                // Partial response; the final ai_message replaces it
+                this.appendStreamChunk(data.content);
+            } else if (data.type === 'ai_reset') {
+                // A function ran; the follow-up answer streams into a fresh bubble
+                this.clearStreamingMessage();
+                this.addTypingIndicator();
+            } else if (data.type === 'ai_message') {
+                // Remove typing indicator and the streamed draft
                 this.removeTypingIndicator();
+                this.clearStreamingMessage();
                 console.log('🤖 AI response:', data.content);
                 this.addMessage(data.content, 'assistant', data.metadata);
             } else if (data.type === 'error') {
                 // Remove typing indicator
                 this.removeTypingIndicator();
+                this.clearStreamingMessage();
                 console.log('❌ Error:', data.content);
                 this.addMessage(data.content, 'error');
             } else if (data.type === 'user_message') {
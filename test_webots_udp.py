@@ -7,11 +7,14 @@ Usage:
     python test_webots_udp.py              # Interactive test with menu
     python test_webots_udp.py --demo       # Run automated demo sequence
     python test_webots_udp.py --stats      # Show statistics only
+    python test_webots_udp.py --live       # Interactive, with a live status line
 """
 
 import sys
 import time
+import asyncio
 import argparse
+import threading
 from pathlib import Path
 
 # Add current directory to path for imports
@@ -55,36 +58,88 @@ def print_status(controller: WebotsUDPController):
     print(f"   Altitude: {status['altitude']:.1f}m")
 
 
+# Single-key menu commands: key -> (label, action)
+_CMDS = {
+    '1': ("Neutral position", lambda c: c.set_control(0, 0, 0, 0)),
+    '2': ("Hover", lambda c: c.set_control(0, 0, 0, 0.6)),
+    '3': ("Takeoff sequence", lambda c: c.arm_and_takeoff(10)),
+    '4': ("Landing sequence", lambda c: c.land()),
+    '5': ("Roll left", lambda c: c.set_control(-1.0, 0, 0, 0.6)),
+    '6': ("Roll right", lambda c: c.set_control(1.0, 0, 0, 0.6)),
+    '7': ("Pitch forward", lambda c: c.set_control(0, 1.0, 0, 0.6)),
+    '8': ("Pitch backward", lambda c: c.set_control(0, -1.0, 0, 0.6)),
+    '9': ("Yaw left", lambda c: c.set_control(0, 0, -1.0, 0.6)),
+    '0': ("Yaw right", lambda c: c.set_control(0, 0, 1.0, 0.6)),
+}
+
+
+async def ainput(prompt: str = "") -> str:
+    """
+    Read a line from stdin without blocking the event loop.
+    
+    The read runs on a daemon thread so an unanswered prompt never holds up
+    interpreter exit (executor threads would be joined at shutdown).
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(setter, value):
+        if not future.done():
+            setter(value)
+
+    def read():
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(deliver, future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(deliver, future.set_result, line)
+
+    threading.Thread(target=read, name="stdin", daemon=True).start()
+    return await future
+
+
+async def status_ticker(controller: WebotsUDPController, interval: float = 1.0):
+    """Print a one-line status summary every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        roll, pitch, yaw, throttle = controller.get_control()
+        print(f"\n📡 r={roll:+.2f} p={pitch:+.2f} y={yaw:+.2f} t={throttle:+.2f} "
+              f"alt={controller.simulated_altitude:.1f}m sent={controller.packets_sent}")
+
+
 def run_demo_sequence(controller: WebotsUDPController):
     """Run an automated demo sequence."""
     print_header("Running Automated Demo Sequence")
     
+    # (description, (roll, pitch, yaw, throttle), duration in seconds)
     sequences = [
-        ("Neutral position", {"roll": 0.0, "pitch": 0.0, "yaw": 0.0, "throttle": 0.0}, 2),
-        ("Hover throttle", {"throttle": 0.6}, 3),
-        ("Roll left", {"roll": -1.0, "throttle": 0.6}, 2),
-        ("Roll right", {"roll": 1.0, "throttle": 0.6}, 2),
-        ("Center roll", {"roll": 0.0, "throttle": 0.6}, 2),
-        ("Pitch forward", {"pitch": 1.0, "throttle": 0.6}, 2),
-        ("Pitch backward", {"pitch": -1.0, "throttle": 0.6}, 2),
-        ("Center pitch", {"pitch": 0.0, "throttle": 0.6}, 2),
-        ("Yaw left", {"yaw": -1.0, "throttle": 0.6}, 2),
-        ("Yaw right", {"yaw": 1.0, "throttle": 0.6}, 2),
-        ("Center yaw", {"yaw": 0.0, "throttle": 0.6}, 2),
-        ("Descend", {"throttle": 0.3}, 2),
-        ("Stop all", {"roll": 0.0, "pitch": 0.0, "yaw": 0.0, "throttle": 0.0}, 1),
+        ("Neutral position", (0.0, 0.0, 0.0, 0.0), 2),
+        ("Hover throttle", (0.0, 0.0, 0.0, 0.6), 3),
+        ("Roll left", (-1.0, 0.0, 0.0, 0.6), 2),
+        ("Roll right", (1.0, 0.0, 0.0, 0.6), 2),
+        ("Center roll", (0.0, 0.0, 0.0, 0.6), 2),
+        ("Pitch forward", (0.0, 1.0, 0.0, 0.6), 2),
+        ("Pitch backward", (0.0, -1.0, 0.0, 0.6), 2),
+        ("Center pitch", (0.0, 0.0, 0.0, 0.6), 2),
+        ("Yaw left", (0.0, 0.0, -1.0, 0.6), 2),
+        ("Yaw right", (0.0, 0.0, 1.0, 0.6), 2),
+        ("Center yaw", (0.0, 0.0, 0.0, 0.6), 2),
+        ("Descend", (0.0, 0.0, 0.0, 0.3), 2),
+        ("Stop all", (0.0, 0.0, 0.0, 0.0), 1),
     ]
     
+    set_ctrl = controller.set_control
     for i, (description, values, duration) in enumerate(sequences, 1):
         print(f"\n[{i}/{len(sequences)}] {description}...")
-        controller.set_control(**values)
+        set_ctrl(*values)
         time.sleep(duration)
     
     print("\n✅ Demo sequence complete!")
 
 
-def run_interactive_mode(controller: WebotsUDPController):
-    """Run interactive control mode."""
+async def run_interactive_mode(controller: WebotsUDPController, live: bool = False):
+    """Run interactive control mode (optionally with a live status line)."""
     print_header("Interactive Control Mode")
     
     print("\nCommands:")
@@ -102,49 +157,34 @@ def run_interactive_mode(controller: WebotsUDPController):
     print("  s. Show status")
     print("  q. Quit")
     
+    ticker = asyncio.create_task(status_ticker(controller)) if live else None
+    try:
+        await _command_loop(controller)
+    finally:
+        if ticker:
+            ticker.cancel()
+
+
+async def _command_loop(controller: WebotsUDPController):
+    """Read and apply menu commands until the user quits."""
     while True:
         try:
-            cmd = input("\n> ").strip().lower()
+            cmd = (await ainput("\n> ")).strip().lower()
             
-            if cmd == 'q':
+            entry = _CMDS.get(cmd)
+            if entry:
+                label, action = entry
+                print(f"→ {label}")
+                action(controller)
+            elif cmd == 'q':
                 break
-            elif cmd == '1':
-                print("→ Neutral position")
-                controller.set_control(0, 0, 0, 0)
-            elif cmd == '2':
-                print("→ Hover")
-                controller.set_control(0, 0, 0, 0.6)
-            elif cmd == '3':
-                print("→ Takeoff sequence")
-                controller.arm_and_takeoff(10)
-            elif cmd == '4':
-                print("→ Landing sequence")
-                controller.land()
-            elif cmd == '5':
-                print("→ Roll left")
-                controller.set_control(-1.0, 0, 0, 0.6)
-            elif cmd == '6':
-                print("→ Roll right")
-                controller.set_control(1.0, 0, 0, 0.6)
-            elif cmd == '7':
-                print("→ Pitch forward")
-                controller.set_control(0, 1.0, 0, 0.6)
-            elif cmd == '8':
-                print("→ Pitch backward")
-                controller.set_control(0, -1.0, 0, 0.6)
-            elif cmd == '9':
-                print("→ Yaw left")
-                controller.set_control(0, 0, -1.0, 0.6)
-            elif cmd == '0':
-                print("→ Yaw right")
-                controller.set_control(0, 0, 1.0, 0.6)
             elif cmd == 'c':
                 try:
                     print("Enter values (press Enter to keep current):")
-                    roll_str = input("  Roll [-2.0 to 2.0]: ").strip()
-                    pitch_str = input("  Pitch [-2.0 to 2.0]: ").strip()
-                    yaw_str = input("  Yaw [-2.0 to 2.0]: ").strip()
-                    throttle_str = input("  Throttle [-1.0 to 1.0]: ").strip()
+                    roll_str = (await ainput("  Roll [-2.0 to 2.0]: ")).strip()
+                    pitch_str = (await ainput("  Pitch [-2.0 to 2.0]: ")).strip()
+                    yaw_str = (await ainput("  Yaw [-2.0 to 2.0]: ")).strip()
+                    throttle_str = (await ainput("  Throttle [-1.0 to 1.0]: ")).strip()
                     
                     roll = float(roll_str) if roll_str else 0.0
                     pitch = float(pitch_str) if pitch_str else 0.0
@@ -160,7 +200,7 @@ def run_interactive_mode(controller: WebotsUDPController):
             else:
                 print("❌ Unknown command")
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             break
         except Exception as e:
             print(f"❌ Error: {e}")
@@ -171,6 +211,7 @@ def main():
     parser = argparse.ArgumentParser(description="Test Webots UDP controller")
     parser.add_argument("--demo", action="store_true", help="Run automated demo sequence")
     parser.add_argument("--stats", action="store_true", help="Show statistics only")
+    parser.add_argument("--live", action="store_true", help="Print live status every second in interactive mode")
     parser.add_argument("--host", default="127.0.0.1", help="UDP host (default: 127.0.0.1)")
     parser.add_argument("--port", type=int, default=9000, help="UDP port (default: 9000)")
     parser.add_argument("--rate", type=int, default=30, help="Update rate in Hz (default: 30)")
@@ -203,7 +244,7 @@ def main():
             run_demo_sequence(controller)
             print_status(controller)
         else:
-            run_interactive_mode(controller)
+            asyncio.run(run_interactive_mode(controller, live=args.live))
         
         return 0
         
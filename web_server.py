@@ -5,18 +5,32 @@ FastAPI server with WebSocket support for real-time drone control.
 """
 
 import os
+import re
+import sys
+import gzip
+import queue
+import logging
+import logging.handlers
 import json
+import time
+import hashlib
+import mimetypes
+import importlib.util
 import asyncio
-import subprocess
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List, Tuple
 from pathlib import Path
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
-from pydantic import BaseModel
+import httpx
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, ConfigDict, ValidationError
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from drone.config import ModelConfig
 from drone.llm_interface import LLMInterface
 from drone.drone_control import DroneController
@@ -26,29 +40,119 @@ from drone.function_tools import FunctionExecutor, format_function_schemas_for_o
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="DeepDrone", description="AI-Powered Drone Control System")
+# Log through a queue so the event loop never blocks on console writes; a
+# background listener thread, run while the app is up, does the actual I/O
+logger = logging.getLogger("deepdrone.web")
+logger.setLevel(os.getenv("DEEPDRONE_LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+_log_queue: queue.Queue = queue.Queue(-1)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_console = logging.StreamHandler(sys.stdout)
+_log_console.setFormatter(logging.Formatter("%(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_console)
+
+# orjson emits bytes directly and is several times faster than stdlib json
+JSON_RESPONSE = ORJSONResponse if orjson is not None else JSONResponse
+
+app = FastAPI(
+    title="DeepDrone",
+    description="AI-Powered Drone Control System",
+    default_response_class=JSON_RESPONSE
+)
+
+@app.on_event("startup")
+def start_log_listener():
+    """Start writing queued log records (including any logged at import) to the console."""
+    _log_listener.start()
 
 # Global state
 drone_controller: Optional[DroneController] = None
 llm_interface: Optional[LLMInterface] = None
 current_config: Optional[ModelConfig] = None
+# Rules section of the chat system prompt for the configured provider, and the
+# whole prompt used while the drone is disconnected (both set in /api/config)
+_prompt_body: str = ""
+_prompt_disconnected: str = ""
+
+# Ollama model list shared between requests (the model picker may poll)
+OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_MODELS_TTL = 5.0
+_ollama_client: Optional[httpx.AsyncClient] = None
+_ollama_cache: Dict = {"ts": float("-inf"), "result": None}
+_ollama_lock: Optional[asyncio.Lock] = None
+_ollama_prefetch: Optional[asyncio.Task] = None
+
+# Drone status shared between the status endpoint and chat context building.
+# While a drone is connected one background task polls it and publishes the
+# snapshot (dict, JSON bytes and prompt context) here for all readers.
+STATUS_POLL_INTERVAL = 0.2
+_DISCONNECTED_STATUS: Dict = {
+    "val": {"connected": False}, "bytes": b'{"connected":false}', "context": "",
+    "controller": None, "seq": None
+}
+_status_cache: Dict = dict(_DISCONNECTED_STATUS)
+_status_task: Optional[asyncio.Task] = None
+
+# Most LLM calls in flight at once (an asyncio.Semaphore, see _stream_chat) so
+# concurrent chats can't flood the provider
+LLM_MAX_CONCURRENCY = 4
+_llm_slots: Optional[asyncio.Semaphore] = None
+
+# Shared by all chat connections; resolves the controller connected at call time
+_FN_EXEC = FunctionExecutor(lambda: drone_controller)
 
 # Pydantic models for API
-class ConfigRequest(BaseModel):
+class _RequestModel(BaseModel):
+    """Base for request bodies: unknown fields are rejected and parsed bodies are read-only."""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+class ConfigRequest(_RequestModel):
     provider: str  # "openai", "anthropic", "google", "ollama"
     api_key: Optional[str] = None
     model: str
 
-class DroneConnectionRequest(BaseModel):
+class DroneConnectionRequest(_RequestModel):
     connection_string: str  # e.g., "udp:127.0.0.1:14550"
 
-class ChatMessage(BaseModel):
+class ChatMessage(_RequestModel):
     message: str
 
+async def _parse_body(request: Request, model):
+    """
+    Validate a JSON request body straight from the raw bytes.
+    
+    model_validate_json parses and validates in one pass, where a typed body
+    parameter has FastAPI decode to a dict first and then validate that. It
+    runs the model's compiled pydantic-core validator, built once per class.
+    """
+    try:
+        return model.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+# Static assets live next to this file, wherever the server is launched from
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+
+# Landing page, read once at startup and revalidated by ETag
+INDEX_PATH = STATIC_DIR / "index.html"
+_index_bytes: Optional[bytes] = None
+_index_etag: Optional[str] = None
+
+@app.on_event("startup")
+def load_index():
+    """Read the landing page into memory and compute its ETag."""
+    global _index_bytes, _index_etag
+    _index_bytes = INDEX_PATH.read_bytes()
+    _index_etag = '"' + hashlib.sha256(_index_bytes).hexdigest()[:16] + '"'
+
 @app.get("/")
-async def read_root():
+async def read_root(request: Request):
     """Serve the main HTML page."""
-    return FileResponse("static/index.html")
+    headers = {"ETag": _index_etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if _index_etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=_index_bytes, media_type="text/html", headers=headers)
 
 @app.get("/api/health")
 async def health_check():
@@ -59,47 +163,70 @@ async def health_check():
         "llm_configured": llm_interface is not None
     }
 
-@app.get("/api/ollama/models")
-async def get_ollama_models():
-    """Get list of locally installed Ollama models."""
+async def _list_ollama_models() -> Dict:
+    """Fetch the installed model names from the Ollama API."""
     try:
-        # Run ollama list command
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-
-        if result.returncode != 0:
-            return {"models": [], "error": "Ollama not installed or not running"}
-
-        # Parse the output
-        lines = result.stdout.strip().split('\n')
-        if len(lines) <= 1:
-            return {"models": []}
-
-        # Skip header line and parse model names
-        models = []
-        for line in lines[1:]:
-            parts = line.split()
-            if parts:
-                model_name = parts[0]
-                models.append(model_name)
-
-        return {"models": models}
-
-    except subprocess.TimeoutExpired:
-        return {"models": [], "error": "Ollama command timed out"}
-    except FileNotFoundError:
-        return {"models": [], "error": "Ollama not installed"}
+        response = await _ollama_client.get("/api/tags")
+        if response.status_code != 200:
+            return {"models": [], "error": f"Ollama returned HTTP {response.status_code}"}
+        return {"models": [m["name"] for m in response.json().get("models", [])]}
+
+    except httpx.ConnectError:
+        return {"models": [], "error": "Ollama not installed or not running"}
+    except httpx.TimeoutException:
+        return {"models": [], "error": "Ollama request timed out"}
     except Exception as e:
         return {"models": [], "error": str(e)}
 
+@app.get("/api/ollama/models")
+async def get_ollama_models():
+    """Get list of locally installed Ollama models (cached for a few seconds)."""
+    global _ollama_lock
+
+    if time.monotonic() - _ollama_cache["ts"] < OLLAMA_MODELS_TTL:
+        return _ollama_cache["result"]
+
+    # Created lazily so it binds to the server's event loop
+    if _ollama_lock is None:
+        _ollama_lock = asyncio.Lock()
+
+    async with _ollama_lock:
+        # Another request may have refreshed the cache while we waited
+        if time.monotonic() - _ollama_cache["ts"] < OLLAMA_MODELS_TTL:
+            return _ollama_cache["result"]
+
+        result = await _list_ollama_models()
+        _ollama_cache["result"] = result
+        _ollama_cache["ts"] = time.monotonic()
+        return result
+
+@app.on_event("startup")
+async def start_ollama_client():
+    """Open the Ollama API client and fill the model cache in the background."""
+    global _ollama_client, _ollama_prefetch
+    _ollama_client = httpx.AsyncClient(base_url=OLLAMA_BASE_URL, timeout=2.0)
+    _ollama_prefetch = asyncio.create_task(get_ollama_models())
+
+@app.on_event("shutdown")
+async def close_ollama_client():
+    """Stop the startup prefetch if it is still running and close the client."""
+    if _ollama_prefetch is not None and not _ollama_prefetch.done():
+        _ollama_prefetch.cancel()
+    if _ollama_client is not None:
+        await _ollama_client.aclose()
+
+@app.on_event("shutdown")
+async def close_llm_interface():
+    """Close the LLM interface's async client."""
+    if llm_interface is not None:
+        await llm_interface.aclose()
+
 @app.post("/api/config")
-async def configure_ai(config: ConfigRequest):
+async def configure_ai(request: Request):
     """Configure AI provider and model."""
-    global llm_interface, current_config
+    global llm_interface, current_config, _prompt_body, _prompt_disconnected
+
+    config = await _parse_body(request, ConfigRequest)
 
     try:
         # Create model config with required fields
@@ -108,12 +235,21 @@ async def configure_ai(config: ConfigRequest):
             provider=config.provider,
             model_id=config.model,
             api_key=config.api_key or os.getenv(f"{config.provider.upper()}_API_KEY"),
-            base_url="http://localhost:11434" if config.provider == "ollama" else None
+            base_url=OLLAMA_BASE_URL if config.provider == "ollama" else None
         )
 
-        # Initialize LLM interface
+        # Initialize LLM interface, releasing the connections of the one it replaces
+        previous_interface = llm_interface
         llm_interface = LLMInterface(model_config)
         current_config = model_config
+        if previous_interface is not None:
+            await previous_interface.aclose()
+            previous_interface.close()
+        # Ollama has no native function calling, so its prompt carries the schemas
+        if config.provider == "ollama":
+            _prompt_body, _prompt_disconnected = _PROMPT_BODY_OLLAMA, _SYS_PROMPT_DISCONNECTED_OLLAMA
+        else:
+            _prompt_body, _prompt_disconnected = _PROMPT_BODY, _SYS_PROMPT_DISCONNECTED
 
         return {
             "status": "success",
@@ -124,13 +260,15 @@ async def configure_ai(config: ConfigRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/drone/connect")
-async def connect_drone(request: DroneConnectionRequest):
+async def connect_drone(http_request: Request):
     """Connect to drone (DroneKit or Webots)."""
     global drone_controller
 
+    request = await _parse_body(http_request, DroneConnectionRequest)
+
     try:
         connection_string = request.connection_string.lower()
-        print(f"🔌 Attempting to connect to drone at: {request.connection_string}")
+        logger.info("🔌 Attempting to connect to drone at: %s", request.connection_string)
 
         # Detect connection type: Webots UDP or DroneKit
         is_webots = (
@@ -139,18 +277,25 @@ async def connect_drone(request: DroneConnectionRequest):
             "webots" in connection_string
         )
 
+        # The poller still points at the controller being replaced
+        _stop_status_polling()
+        if drone_controller is not None:
+            # Stops its telemetry/control threads before it is dropped
+            drone_controller.disconnect()
+
         if is_webots:
-            print("🎮 Using Webots UDP controller")
+            logger.info("🎮 Using Webots UDP controller")
             drone_controller = WebotsDroneAdapter(request.connection_string)
         else:
-            print("🚁 Using DroneKit controller (MAVLink)")
+            logger.info("🚁 Using DroneKit controller (MAVLink)")
             drone_controller = DroneController(request.connection_string)
 
         success = drone_controller.connect_to_drone()
 
         if success:
             controller_type = "Webots simulator" if is_webots else "drone"
-            print(f"✅ Successfully connected to {controller_type}")
+            logger.info("✅ Successfully connected to %s", controller_type)
+            await _start_status_polling(drone_controller)
             return {
                 "status": "success",
                 "message": f"Connected to {controller_type} at {request.connection_string}",
@@ -158,14 +303,12 @@ async def connect_drone(request: DroneConnectionRequest):
             }
         else:
             error_msg = "Failed to connect to drone. Make sure the simulator is running (should be started automatically by start.sh)"
-            print(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             raise HTTPException(status_code=400, detail=error_msg)
 
     except Exception as e:
         error_msg = f"Connection error: {str(e)}"
-        print(f"❌ {error_msg}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ %s", error_msg)
 
         # Provide helpful error messages
         if "Connection refused" in str(e):
@@ -181,9 +324,9 @@ async def disconnect_drone():
     global drone_controller
 
     if drone_controller:
+        _stop_status_polling()
         try:
-            if drone_controller.vehicle:
-                drone_controller.vehicle.close()
+            drone_controller.disconnect()
             drone_controller = None
             return {"status": "success", "message": "Disconnected from drone"}
         except Exception as e:
@@ -191,69 +334,356 @@ async def disconnect_drone():
 
     return {"status": "success", "message": "No drone connected"}
 
-@app.get("/api/drone/status")
-async def get_drone_status():
-    """Get current drone status."""
-    if not drone_controller:
-        return {"connected": False}
-    
-    # Check connected status - handle both DroneKit and Webots
-    if not drone_controller.connected:
-        return {"connected": False}
-
+def _snapshot_vehicle(vehicle) -> Dict:
+    """Read the status dict off a vehicle (blocking: each DroneKit attribute may wait on MAVLink)."""
     try:
-        vehicle = drone_controller.vehicle
-        if not vehicle:
-            # This shouldn't happen, but handle it
-            print(f"⚠️  WARNING: Controller connected but vehicle is None")
-            return {"connected": False, "error": "Vehicle object not initialized"}
+        # Read each vehicle attribute once; every access goes through DroneKit
+        mode = vehicle.mode
+        battery = getattr(vehicle, 'battery', None)
+        location = getattr(vehicle, 'location', None)
+        relative_frame = location.global_relative_frame if location else None
+        global_frame = location.global_frame if location else None
         
         return {
             "connected": True,
-            "mode": str(vehicle.mode.name) if hasattr(vehicle.mode, 'name') else str(vehicle.mode),
+            "mode": str(mode.name) if hasattr(mode, 'name') else str(mode),
             "armed": vehicle.armed,
-            "battery": vehicle.battery.level if hasattr(vehicle, 'battery') and vehicle.battery else 100.0,
-            "altitude": vehicle.location.global_relative_frame.alt if hasattr(vehicle, 'location') and vehicle.location else 0.0,
+            "battery": battery.level if battery else 100.0,
+            "altitude": relative_frame.alt if relative_frame else 0.0,
             "gps": {
-                "lat": vehicle.location.global_frame.lat if hasattr(vehicle, 'location') and vehicle.location else 0.0,
-                "lon": vehicle.location.global_frame.lon if hasattr(vehicle, 'location') and vehicle.location else 0.0
+                "lat": global_frame.lat if global_frame else 0.0,
+                "lon": global_frame.lon if global_frame else 0.0
             }
         }
     except Exception as e:
         # Log the actual error for debugging
-        print(f"❌ Error getting drone status: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error getting drone status: %s", e)
         return {"connected": False, "error": str(e)}
 
+async def _refresh_status(controller) -> None:
+    """
+    Take one status snapshot of controller and publish it to _status_cache.
+    
+    The snapshot is serialized here, once, for both the status endpoint and the
+    chat prompt. Nothing is read while the controller's state_seq hasn't moved.
+    """
+    seq = getattr(controller, "state_seq", None) if controller and controller.connected else None
+    if (_status_cache["controller"] is controller and seq is not None
+            and seq == _status_cache["seq"] and _status_cache["val"].get("connected")):
+        return
+
+    # Disconnected states are answered without touching the vehicle or a thread
+    if not controller or not controller.connected:
+        val = {"connected": False}
+    elif not controller.vehicle:
+        # This shouldn't happen, but handle it
+        logger.warning("⚠️  WARNING: Controller connected but vehicle is None")
+        val = {"connected": False, "error": "Vehicle object not initialized"}
+    else:
+        val = await asyncio.to_thread(_snapshot_vehicle, controller.vehicle)
+        if controller is not drone_controller:
+            # Disconnected or replaced during the read
+            return
+    encoded = orjson.dumps(val) if orjson is not None else json.dumps(val, separators=(',', ':')).encode()
+    # Swapped in one step on the loop, so readers never see a half-updated snapshot
+    _status_cache.update(val=val, bytes=encoded, context="\nCurrent Drone Status: " + encoded.decode(),
+                         controller=controller, seq=seq)
+
+async def _status_poll_loop(controller) -> None:
+    """Refresh the shared status snapshot every STATUS_POLL_INTERVAL until cancelled."""
+    while True:
+        await asyncio.sleep(STATUS_POLL_INTERVAL)
+        try:
+            await _refresh_status(controller)
+        except Exception as e:
+            logger.exception("❌ Status poll failed: %s", e)
+
+async def _start_status_polling(controller) -> None:
+    """Publish a first snapshot of controller, then keep it fresh in the background."""
+    global _status_task
+    _stop_status_polling()
+    await _refresh_status(controller)
+    _status_task = asyncio.create_task(_status_poll_loop(controller))
+
+def _stop_status_polling() -> None:
+    """Cancel the status poller and publish the disconnected snapshot."""
+    global _status_task
+    if _status_task is not None:
+        _status_task.cancel()
+        _status_task = None
+    _status_cache.update(_DISCONNECTED_STATUS)
+
+@app.on_event("shutdown")
+def stop_status_polling():
+    """Stop the status poller."""
+    _stop_status_polling()
+
+@app.get("/api/drone/status", response_model=None)
+async def get_drone_status():
+    """Get current drone status."""
+    # The poller keeps the body pre-serialized, so this is a plain byte copy
+    return Response(_status_cache["bytes"], media_type="application/json")
+
+FUNCTION_MARKER = "EXECUTE_FUNCTION:"
+
+# "EXECUTE_FUNCTION: name" at a line start, optionally followed by an
+# "ARGUMENTS:" line whose JSON (possibly nested or multi-line) runs to the end
+_FUNCTION_CALL_RE = re.compile(
+    r"^EXECUTE_FUNCTION:[ \t]*(\S+)[^\n]*(?:\n\s*ARGUMENTS:[ \t]*(.*))?",
+    re.MULTILINE | re.DOTALL
+)
+_JSON_DECODER = json.JSONDecoder()
+
+def _parse_function_call(text: str) -> Tuple[Optional[str], Dict]:
+    """
+    Extract a function call from an LLM response.
+    
+    Args:
+        text: Response content containing an EXECUTE_FUNCTION directive
+        
+    Returns:
+        Tuple of (function name or None, arguments dict)
+    """
+    match = _FUNCTION_CALL_RE.search(text)
+    if not match:
+        return None, {}
+
+    arguments = {}
+    args_text = (match.group(2) or "").strip()
+    if args_text:
+        try:
+            # raw_decode stops at the end of the first JSON value, so trailing
+            # prose after the arguments is ignored
+            arguments, _ = _JSON_DECODER.raw_decode(args_text)
+        except json.JSONDecodeError:
+            logger.warning("⚠️  Failed to parse arguments: %s", args_text[:200])
+    return match.group(1), arguments
+
+def _describe_status(result: Dict) -> str:
+    """Phrase a get_status result for the user."""
+    altitude = result.get("altitude")
+    battery = result.get("battery")
+    gps = result.get("gps") or {}
+    parts = [
+        f"The drone is in {result.get('mode')} mode and {'armed' if result.get('armed') else 'disarmed'}",
+        f"at {altitude:.1f}m" if altitude is not None else "at an unknown altitude",
+    ]
+    text = " ".join(parts)
+    if battery is not None:
+        text += f", with {battery:.0f}% battery"
+    if gps.get("lat") is not None and gps.get("lon") is not None:
+        text += f". Position: ({gps['lat']:.6f}, {gps['lon']:.6f})"
+    return text + "."
+
+# Canned phrasings for successful function results; anything not listed here
+# (or any failure) still goes back to the LLM to be explained
+_FN_RESULT_TEMPLATES: Dict[str, Callable[[Dict], str]] = {
+    "arm_and_takeoff": lambda r: r["message"],
+    "land": lambda r: r["message"] + ".",
+    "return_to_launch": lambda r: r["message"] + ".",
+    "goto_location": lambda r: r["message"] + ".",
+    "set_airspeed": lambda r: r["message"] + ".",
+    "get_status": _describe_status,
+}
+
+def _template_result(function_name: str, result: Dict) -> Optional[str]:
+    """
+    Phrase a function result without an LLM roundtrip.
+    
+    Returns:
+        The message for the user, or None if the LLM should explain the result
+    """
+    template = _FN_RESULT_TEMPLATES.get(function_name)
+    if template is None or not result.get("success") or result.get("error"):
+        return None
+    try:
+        return template(result)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+# Static parts of the chat system prompt; only the connection note, drone
+# status and function list vary per message
+_PROMPT_HEAD = """You are DeepDrone AI, an assistant that controls drones using natural language.
+
+"""
+_PROMPT_RULES = """
+
+IMPORTANT: When the user asks you to perform a drone action (like takeoff, land, fly somewhere, etc.), you MUST execute the appropriate function immediately. Do NOT just provide instructions - actually execute the command.
+
+"""
+_PROMPT_TAIL = """
+
+When executing commands:
+1. ALWAYS check the drone status above - if connected is true, the drone IS ready
+2. Use the functions to perform the action
+3. After getting the function result, explain what happened to the user in a friendly way
+
+Example of how to execute a function:
+User: "Take off to 20 meters"
+Your response:
+EXECUTE_FUNCTION: arm_and_takeoff
+ARGUMENTS: {"altitude": 20}"""
+
+# Prompt segments pre-joined for each connection state / provider combination
+_PROMPT_CONNECTED = _PROMPT_HEAD + "The drone IS CONNECTED and ready for commands.\n"
+_PROMPT_DISCONNECTED = _PROMPT_HEAD + "The drone is NOT CONNECTED. Tell the user to connect first.\n"
+_PROMPT_BODY = _PROMPT_RULES + _PROMPT_TAIL
+_PROMPT_BODY_OLLAMA = _PROMPT_RULES + "\n\n" + format_function_schemas_for_ollama(FUNCTION_SCHEMAS) + _PROMPT_TAIL
+# Disconnected prompts carry no live status, so they are complete constants
+_SYS_PROMPT_DISCONNECTED = _PROMPT_DISCONNECTED + _PROMPT_BODY
+_SYS_PROMPT_DISCONNECTED_OLLAMA = _PROMPT_DISCONNECTED + _PROMPT_BODY_OLLAMA
+
+class _TokenRelay:
+    """
+    Forward streamed LLM tokens to the client as ai_chunk frames.
+    
+    Function-call directives are not meant for the user, so everything from
+    FUNCTION_MARKER onwards is held back (including a trailing partial marker).
+    """
+
+    def __init__(self, outbox: "_Outbox"):
+        self.outbox = outbox
+        # Text not yet sent: at most a partial marker, so each token is O(len(token))
+        self.pending = ""
+        self.muted = False
+
+    def __call__(self, token: str):
+        if self.muted:
+            return
+        self.pending += token
+
+        end = self.pending.find(FUNCTION_MARKER)
+        if end >= 0:
+            self.muted = True
+        else:
+            end = len(self.pending)
+            for k in range(min(len(FUNCTION_MARKER) - 1, len(self.pending)), 0, -1):
+                if self.pending.endswith(FUNCTION_MARKER[:k]):
+                    end -= k
+                    break
+
+        if end > 0:
+            self.outbox.send({"type": "ai_chunk", "content": self.pending[:end]})
+            self.pending = self.pending[end:]
+
+def _decode_chat_frame(data: str) -> str:
+    """
+    Decode an inbound chat frame ({"message": str}) in a single pass.
+    
+    Raises:
+        ValueError: If the frame is not JSON or not shaped like a chat message
+    """
+    # orjson.JSONDecodeError and json.JSONDecodeError both subclass ValueError
+    frame = orjson.loads(data) if orjson is not None else json.loads(data)
+    if not isinstance(frame, dict):
+        raise ValueError("expected a JSON object")
+    message = frame.get("message", "")
+    if not isinstance(message, str):
+        raise ValueError("'message' must be a string")
+    return message
+
+async def _send(websocket: WebSocket, payload: Dict):
+    """Send a JSON frame, encoded with orjson (as a binary frame) when available."""
+    if orjson is not None:
+        await websocket.send_bytes(orjson.dumps(payload))
+    else:
+        await websocket.send_json(payload)
+
+class _Outbox:
+    """
+    Per-connection send queue drained by a single writer task.
+    
+    Producers (the chat handler, token relays) enqueue without awaiting the
+    socket; the writer sends in order and merges runs of ai_chunk frames that
+    queued up while it was busy into one frame.
+    """
+
+    MAX_BATCH = 64
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.writer = asyncio.create_task(self._writer())
+
+    def send(self, payload: Dict):
+        """Queue a JSON frame for the client."""
+        self.queue.put_nowait(payload)
+
+    def close(self):
+        """Stop the writer task (queued frames are dropped)."""
+        self.writer.cancel()
+
+    async def _writer(self):
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                while len(batch) < self.MAX_BATCH and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                for payload in self._coalesce(batch):
+                    await _send(self.websocket, payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The receive loop sees the disconnect and cleans up
+            logger.info("🔌 WebSocket writer stopped: %s", e)
+
+    @staticmethod
+    def _coalesce(batch: List[Dict]) -> List[Dict]:
+        """Merge adjacent ai_chunk frames, keeping every other frame in order."""
+        merged = []
+        for payload in batch:
+            if payload.get("type") == "ai_chunk" and merged and merged[-1].get("type") == "ai_chunk":
+                merged[-1] = {"type": "ai_chunk", "content": merged[-1]["content"] + payload["content"]}
+            else:
+                merged.append(payload)
+        return merged
+
+async def _stream_chat(outbox: _Outbox, messages: List[Dict]) -> Dict:
+    """
+    Run achat_with_metadata on the event loop, relaying tokens as ai_chunk frames.
+    
+    Args:
+        outbox: Client connection to stream to
+        messages: Chat messages
+        
+    Returns:
+        The complete achat_with_metadata result
+    """
+    global _llm_slots
+    if _llm_slots is None:
+        _llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    async with _llm_slots:
+        return await llm_interface.achat_with_metadata(messages, on_token=_TokenRelay(outbox))
+
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
     """WebSocket endpoint for real-time chat."""
     await websocket.accept()
-    print("✅ WebSocket client connected")
-    
-    # Create function executor
-    function_executor = FunctionExecutor(drone_controller)
+    logger.info("✅ WebSocket client connected")
+    outbox = _Outbox(websocket)
 
     try:
         while True:
             # Receive message from client
             data = await websocket.receive_text()
-            message_data = json.loads(data)
-            user_message = message_data.get("message", "")
+            try:
+                user_message = _decode_chat_frame(data)
+            except ValueError as e:
+                outbox.send({"type": "error", "content": f"Invalid message: {e}"})
+                continue
 
-            print(f"📨 Received message: {user_message}")
+            logger.info("📨 Received message: %s", user_message)
 
             # Send user message acknowledgment
-            await websocket.send_json({
+            outbox.send({
                 "type": "user_message",
                 "content": user_message
             })
 
             # Check if LLM is configured
             if not llm_interface:
-                print("❌ LLM not configured")
-                await websocket.send_json({
+                logger.warning("❌ LLM not configured")
+                outbox.send({
                     "type": "error",
                     "content": "Please configure an AI provider first"
                 })
@@ -261,49 +691,17 @@ async def websocket_chat(websocket: WebSocket):
 
             # Process with LLM
             try:
-                print(f"🤖 Processing with LLM...")
-                
-                # Update function executor with current drone controller
-                function_executor.drone_controller = drone_controller
-
-                # Get drone context if connected
-                drone_context = ""
-                if drone_controller and drone_controller.connected:
-                    status = await get_drone_status()
-                    drone_context = f"\nCurrent Drone Status: {json.dumps(status, indent=2)}"
-                    print(f"🚁 Added drone context: connected={status.get('connected', False)}")
-                else:
-                    print(f"⚠️  Drone not connected (controller exists: {drone_controller is not None}, connected: {drone_controller.connected if drone_controller else False})")
-
-                # Add function schemas for Ollama
-                functions_info = ""
-                if current_config and current_config.provider == "ollama":
-                    functions_info = "\n\n" + format_function_schemas_for_ollama(FUNCTION_SCHEMAS)
-
-                # Create messages for LLM
-                # Check connection status for better prompt
-                is_connected = drone_controller and drone_controller.connected if drone_controller else False
-                connection_note = "The drone IS CONNECTED and ready for commands." if is_connected else "The drone is NOT CONNECTED. Tell the user to connect first."
-                
-                system_prompt = f"""You are DeepDrone AI, an assistant that controls drones using natural language.
-
-{connection_note}
-{drone_context}
-
-IMPORTANT: When the user asks you to perform a drone action (like takeoff, land, fly somewhere, etc.), you MUST execute the appropriate function immediately. Do NOT just provide instructions - actually execute the command.
+                logger.debug("🤖 Processing with LLM...")
 
-{functions_info}
-
-When executing commands:
-1. ALWAYS check the drone status above - if connected is true, the drone IS ready
-2. Use the functions to perform the action
-3. After getting the function result, explain what happened to the user in a friendly way
-
-Example of how to execute a function:
-User: "Take off to 20 meters"
-Your response:
-EXECUTE_FUNCTION: arm_and_takeoff
-ARGUMENTS: {{"altitude": 20}}"""
+                # Create messages for LLM: connection-specific head, live status,
+                # then the provider's rules (chosen when the AI was configured)
+                if drone_controller is not None and drone_controller.connected:
+                    system_prompt = "".join((_PROMPT_CONNECTED, _status_cache["context"], _prompt_body))
+                    logger.debug("🚁 Added drone context: connected=%s", _status_cache["val"].get('connected', False))
+                else:
+                    # Nothing live to add, so the prompt is a prebuilt constant
+                    system_prompt = _prompt_disconnected
+                    logger.debug("⚠️  Drone not connected (controller exists: %s)", drone_controller is not None)
 
                 messages = [
                     {"role": "system", "content": system_prompt},
@@ -311,66 +709,53 @@ ARGUMENTS: {{"altitude": 20}}"""
                 ]
 
                 # Get LLM response
-                print(f"⏳ Calling LLM chat method...")
-                response_data = await asyncio.to_thread(
-                    llm_interface.chat_with_metadata,
-                    messages
-                )
-
-                print(f"✅ Got LLM response")
-                print(f"Response data type: {type(response_data)}")
-                print(f"Response data keys: {response_data.keys() if isinstance(response_data, dict) else 'NOT A DICT'}")
+                logger.debug("⏳ Calling LLM chat method...")
+                response_data = await _stream_chat(outbox, messages)
+
+                logger.debug("✅ Got LLM response (%s)", type(response_data).__name__)
                 
                 # Check if response contains a function call
                 response_content = response_data.get("content", "") if isinstance(response_data, dict) else str(response_data)
-                print(f"Response content preview (first 200 chars): {response_content[:200]}")
+                logger.debug("Response content preview (first 200 chars): %s", response_content[:200])
                 
                 # Parse function calls from response
-                if "EXECUTE_FUNCTION:" in response_content:
-                    print("🔧 Function call detected in response")
+                if FUNCTION_MARKER in response_content:
+                    logger.info("🔧 Function call detected in response")
                     
                     # Extract function name and arguments
-                    lines = response_content.split('\n')
-                    function_name = None
-                    arguments = {}
-                    
-                    for i, line in enumerate(lines):
-                        if line.startswith("EXECUTE_FUNCTION:"):
-                            function_name = line.replace("EXECUTE_FUNCTION:", "").strip()
-                        elif line.startswith("ARGUMENTS:"):
-                            try:
-                                args_str = line.replace("ARGUMENTS:", "").strip()
-                                arguments = json.loads(args_str) if args_str else {}
-                            except json.JSONDecodeError:
-                                print(f"⚠️  Failed to parse arguments: {line}")
+                    function_name, arguments = _parse_function_call(response_content)
                     
                     if function_name:
-                        print(f"⚡ Executing function: {function_name} with args: {arguments}")
+                        logger.info("⚡ Executing function: %s with args: %s", function_name, arguments)
                         
                         # Execute the function
                         result = await asyncio.to_thread(
-                            function_executor.execute_function,
+                            _FN_EXEC.execute_function,
                             function_name,
                             arguments
                         )
                         
-                        print(f"✅ Function result: {result}")
+                        logger.info("✅ Function result: %s", result)
                         
-                        # Ask LLM to format the result for the user
-                        follow_up_prompt = f"""The function {function_name} was executed with result: {json.dumps(result)}
+                        # Common successful results have a canned phrasing,
+                        # which saves a whole LLM roundtrip
+                        templated = _template_result(function_name, result)
+                        if templated is not None:
+                            response_data = {"content": templated}
+                        else:
+                            # Ask LLM to format the result for the user
+                            follow_up_prompt = f"""The function {function_name} was executed with result: {json.dumps(result)}
 
 Please explain this result to the user in a natural, friendly way. Be concise."""
-                        
-                        messages.append({"role": "assistant", "content": response_content})
-                        messages.append({"role": "user", "content": follow_up_prompt})
-                        
-                        # Get formatted response
-                        final_response_data = await asyncio.to_thread(
-                            llm_interface.chat_with_metadata,
-                            messages
-                        )
-                        
-                        response_data = final_response_data
+                            
+                            messages.append({"role": "assistant", "content": response_content})
+                            messages.append({"role": "user", "content": follow_up_prompt})
+                            
+                            # Get formatted response, streamed into a fresh bubble
+                            outbox.send({"type": "ai_reset"})
+                            final_response_data = await _stream_chat(outbox, messages)
+                            
+                            response_data = final_response_data
 
                 # Send AI response
                 if response_data and isinstance(response_data, dict) and response_data.get("content"):
@@ -381,41 +766,126 @@ Please explain this result to the user in a natural, friendly way. Be concise.""
                         metadata["thinking_time"] = response_data.get("thinking_time", 0)
                     
                     content_to_send = response_data["content"]
-                    print(f"📤 Sending content to client (length: {len(content_to_send)}, preview: {content_to_send[:100]})")
+                    logger.debug("📤 Sending content to client (length: %d, preview: %s)", len(content_to_send), content_to_send[:100])
                     
-                    await websocket.send_json({
+                    outbox.send({
                         "type": "ai_message",
                         "content": content_to_send,
                         "metadata": metadata if metadata else None
                     })
-                    print(f"📤 Sent response to client successfully")
+                    logger.debug("📤 Queued response for client")
                 else:
-                    print(f"⚠️  Empty response from LLM!")
-                    await websocket.send_json({
+                    logger.warning("⚠️  Empty response from LLM!")
+                    outbox.send({
                         "type": "error",
                         "content": "Received empty response from AI model"
                     })
 
             except Exception as e:
-                print(f"❌ Error processing message: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Error processing message: %s", e)
 
-                await websocket.send_json({
+                outbox.send({
                     "type": "error",
                     "content": f"Error processing message: {str(e)}"
                 })
 
     except WebSocketDisconnect:
-        print("🔌 Client disconnected")
+        logger.info("🔌 Client disconnected")
     except Exception as e:
-        print(f"❌ WebSocket error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ WebSocket error: %s", e)
         await websocket.close()
+    finally:
+        outbox.close()
+
+class InMemoryStatic:
+    """
+    ASGI app serving a directory's files from memory.
+    
+    Every file is read and gzip-compressed once up front; requests are answered
+    without touching the filesystem, with the gzip variant when the client
+    accepts it and a 304 when its ETag still matches.
+    """
+
+    def __init__(self, directory: Path):
+        # Fail at startup like StaticFiles would, rather than 404 every asset
+        if not directory.is_dir():
+            raise RuntimeError(f"Static directory '{directory}' does not exist")
+        self.files: Dict[str, tuple] = {}
+        for path in directory.rglob("*"):
+            if not path.is_file():
+                continue
+            content = path.read_bytes()
+            compressed = gzip.compress(content, 9)
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            etag = '"' + hashlib.sha256(content).hexdigest()[:16] + '"'
+            self.files[path.relative_to(directory).as_posix()] = (
+                content,
+                # Only worth sending when it is actually smaller
+                compressed if len(compressed) < len(content) else None,
+                media_type,
+                etag
+            )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        # Newer Starlette keeps the mount prefix in path and reports it as root_path
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+
+        entry = self.files.get(path.lstrip("/"))
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._respond(send, 405, [], b"")
+            return
+        if entry is None:
+            await self._respond(send, 404, [(b"content-type", b"text/plain")], b"Not Found")
+            return
+
+        content, compressed, media_type, etag = entry
+        request_headers = dict(scope["headers"])
+        headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", b"no-cache"),
+            (b"vary", b"accept-encoding"),
+        ]
+
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            await self._respond(send, 304, headers, b"")
+            return
+
+        body = content
+        if compressed is not None and b"gzip" in request_headers.get(b"accept-encoding", b""):
+            body = compressed
+            headers.append((b"content-encoding", b"gzip"))
+        headers.append((b"content-type", media_type.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await self._respond(send, 200, headers, b"" if scope["method"] == "HEAD" else body)
+
+    @staticmethod
+    async def _respond(send, status: int, headers: List[tuple], body: bytes):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+# Registered last so records logged by the other shutdown hooks are still written
+@app.on_event("shutdown")
+def stop_log_listener():
+    """Flush queued log records and stop the listener thread."""
+    _log_listener.stop()
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", InMemoryStatic(STATIC_DIR), name="static")
+
+# C-accelerated event loop and HTTP parser (from uvicorn[standard]); the pure
+# Python ones are kept as a fallback where the wheels are unavailable (Windows)
+UVICORN_OPTIONS = {
+    "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+    "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+    "ws": "websockets",
+}
 
 if __name__ == "__main__":
     import uvicorn
@@ -423,4 +893,4 @@ if __name__ == "__main__":
     print("🚁 Starting DeepDrone Web Server...")
     print("📡 Open your browser at: http://localhost:8000")
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, **UVICORN_OPTIONS)
@@ -125,9 +125,23 @@ int main(int argc, char **argv) {
     if (len > 0) {
       buffer[len] = '\0';
       
-      // Parse: "roll pitch yaw throttle"
-      if (sscanf(buffer, "%lf %lf %lf %lf",
-                 &api_roll, &api_pitch, &api_yaw, &api_throttle) == 4) {
+      int parsed = 0;
+      if (len == 4 * sizeof(float)) {
+        // Binary: four little-endian float32 (wire_format="binary" in Python)
+        float values[4];
+        memcpy(values, buffer, sizeof(values));
+        api_roll = values[0];
+        api_pitch = values[1];
+        api_yaw = values[2];
+        api_throttle = values[3];
+        parsed = 1;
+      } else {
+        // ASCII: "roll pitch yaw throttle"
+        parsed = sscanf(buffer, "%lf %lf %lf %lf",
+                        &api_roll, &api_pitch, &api_yaw, &api_throttle) == 4;
+      }
+      
+      if (parsed) {
         packets_received++;
         last_packet_time = time(NULL);
         